@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+
+"""Module for sub-allocation of vertex ranges in large buffers.
+
+Arena keeps only the bookkeeping without OpenGL. Every allocation gets a
+slot and first vertex, allocated size, vertex count and visibility of
+slots are numpy arrays, so visible ranges for one multi-draw call are
+selected without a loop over chunks.
+"""
+
+import bisect
+import collections
+
+import numpy
+
+
+class Arena(object):
+    """Vertex ranges allocated in a buffer with free list.
+
+    Args:
+        capacity (int): buffer size in vertexes
+        slots (int): initial number of slots
+    """
+
+    def __init__(self, capacity, slots=64):
+
+        self.capacity = capacity
+
+        # sorted list of free (first, size) ranges
+        self.free_ranges = [(0, capacity)]
+
+        self.firsts = numpy.zeros(slots, numpy.int32)
+        self.sizes = numpy.zeros(slots, numpy.int32)
+        self.counts = numpy.zeros(slots, numpy.int32)
+        self.visible = numpy.zeros(slots, numpy.bool_)
+        self.used = numpy.zeros(slots, numpy.bool_)
+
+        self.free_slots = collections.deque(range(slots))
+
+    @property
+    def free_space(self):
+        """Return number of free vertexes in all free ranges."""
+
+        return sum(size for first, size in self.free_ranges)
+
+    @property
+    def compactable_space(self):
+        """Return number of free vertexes after compaction.
+
+        Unused ends of ranges are released by compaction too.
+        """
+
+        unused = (self.sizes - self.counts)[self.used].sum()
+
+        return self.free_space + int(unused)
+
+    @property
+    def empty(self):
+        """Return True if no slot is used."""
+
+        return not self.used.any()
+
+    def get_slot(self):
+        """Return free slot, slot arrays are grown if necessary."""
+
+        if not self.free_slots:
+
+            slots = len(self.used)
+            for name in ("firsts", "sizes", "counts", "visible", "used"):
+
+                values = getattr(self, name)
+                setattr(self, name, numpy.concatenate(
+                    (values, numpy.zeros_like(values))))
+
+            self.free_slots.extend(range(slots, slots * 2))
+
+        return self.free_slots.popleft()
+
+    def take_range(self, count):
+        """Return first vertex of the first big enough free range.
+
+        Args:
+            count (int): number of vertexes
+
+        Return:
+            int or None: first vertex or None without big enough range
+        """
+
+        for index, (first, size) in enumerate(self.free_ranges):
+
+            if size >= count:
+
+                if size == count:
+
+                    del self.free_ranges[index]
+
+                else:
+
+                    self.free_ranges[index] = (first + count, size - count)
+
+                return first
+
+        return None
+
+    def allocate(self, count):
+        """Allocate the first free range big enough for vertexes.
+
+        Args:
+            count (int): number of vertexes
+
+        Return:
+            int or None: slot or None without big enough free range
+        """
+
+        # empty mesh needs no space, even in a full arena
+        first = 0
+        if count > 0:
+
+            first = self.take_range(count)
+            if first is None:
+
+                return None
+
+        slot = self.get_slot()
+        self.firsts[slot] = first
+        self.sizes[slot] = count
+        self.counts[slot] = count
+        self.visible[slot] = False
+        self.used[slot] = True
+
+        return slot
+
+    def free(self, slot):
+        """Return range of the slot to the free list."""
+
+        first = int(self.firsts[slot])
+        size = int(self.sizes[slot])
+
+        self.used[slot] = False
+        self.visible[slot] = False
+        self.counts[slot] = 0
+        self.free_slots.append(slot)
+
+        if size == 0:
+
+            return
+
+        index = bisect.bisect(self.free_ranges, (first, size))
+        self.free_ranges.insert(index, (first, size))
+
+        # merge with the following and the previous range
+        if index + 1 < len(self.free_ranges):
+
+            next_first, next_size = self.free_ranges[index + 1]
+            if first + size == next_first:
+
+                size += next_size
+                self.free_ranges[index] = (first, size)
+                del self.free_ranges[index + 1]
+
+        if index > 0:
+
+            previous_first, previous_size = self.free_ranges[index - 1]
+            if previous_first + previous_size == first:
+
+                self.free_ranges[index - 1] = (
+                    previous_first, previous_size + size)
+                del self.free_ranges[index]
+
+    def compact(self):
+        """Move used ranges to the buffer start.
+
+        Unused vertexes at the end of ranges are released too.
+
+        Return:
+            list: (old first, new first, count) moves in the buffer
+        """
+
+        slots = numpy.flatnonzero(self.used)
+        slots = slots[numpy.argsort(self.firsts[slots])]
+
+        moves = []
+        end = 0
+        for slot in slots:
+
+            count = int(self.counts[slot])
+            if count > 0:
+
+                moves.append((int(self.firsts[slot]), end, count))
+
+            self.firsts[slot] = end
+            self.sizes[slot] = count
+            end += count
+
+        self.free_ranges = []
+        if end < self.capacity:
+
+            self.free_ranges.append((end, self.capacity - end))
+
+        return moves
+
+    def ranges(self):
+        """Return first vertexes and counts of visible ranges.
+
+        Return:
+            (numpy.ndarray, numpy.ndarray): int32 firsts and counts
+        """
+
+        mask = self.visible & (self.counts > 0)
+
+        return self.firsts[mask], self.counts[mask]
@@ -0,0 +1,175 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Performance benchmarks."""
+
+from __future__ import print_function
+
+import argparse
+import shutil
+import tempfile
+import time
+
+import numpy
+
+import data
+import functions
+import meshing
+import region
+
+
+def chunk_positions(count, chunk_type):
+    """Return positions for square of chunks.
+
+    Args:
+        count (int): number of chunks
+        chunk_type (Chunk): type of chunks
+
+    Return:
+        list: X and Z coordinates of chunks
+    """
+
+    side = int(count ** 0.5) + 1
+
+    positions = []
+    for x_pos in range(side):
+        for z_pos in range(side):
+
+            positions.append(
+                (x_pos * chunk_type.size, z_pos * chunk_type.size))
+
+    return positions[:count]
+
+
+def print_result(name, count, seconds):
+
+    print("{}: {} chunks in {:.3f} s ({:.0f} chunks/s)".format(
+        name, count, seconds, count / seconds))
+
+
+def benchmark_generation(count, chunk_type=data.NormalChunk):
+    """Measure chunk generation throughput."""
+
+    positions = chunk_positions(count, chunk_type)
+
+    for mode in ("random", "noise"):
+
+        start = time.time()
+        for position in positions:
+
+            functions.generate_chunk(
+                chunk_type.size, chunk_type.height, mode, 1, position)
+
+        print_result("generate " + mode, count, time.time() - start)
+
+
+def benchmark_region(count, chunk_type=data.NormalChunk):
+    """Measure region files save and load throughput."""
+
+    positions = chunk_positions(count, chunk_type)
+    chunks = functions.generate_chunks(
+        positions, chunk_type.size, chunk_type.height, "noise", 1)
+
+    directory = tempfile.mkdtemp()
+    try:
+
+        store = region.RegionStore(directory, chunk_type)
+
+        start = time.time()
+        for position, blocks in zip(positions, chunks):
+
+            store.save(position, blocks)
+
+        store.close()
+        print_result("region save", count, time.time() - start)
+
+        store = region.RegionStore(directory, chunk_type)
+
+        start = time.time()
+        for position in positions:
+
+            store.load(position)
+
+        store.close()
+        print_result("region load", count, time.time() - start)
+
+    finally:
+
+        shutil.rmtree(directory)
+
+
+def graphic_block_mesh(blocks, position):
+    """Return mesh built from GraphicBlock vertexes of every block."""
+
+    # graphics needs an OpenGL context
+    import core
+    import graphics
+
+    vertexes = []
+    for block in core.block_positions(blocks, position):
+
+        vertexes.extend(graphics.GraphicBlock.get_vertexes(block))
+
+    return numpy.array(vertexes, numpy.float32).reshape(-1, 3)
+
+
+def benchmark_meshing(count, chunk_type=data.NormalChunk):
+    """Compare vertex counts and build time of mesh modes."""
+
+    positions = chunk_positions(count, chunk_type)
+    chunks = functions.generate_chunks(
+        positions, chunk_type.size, chunk_type.height, "noise", 1)
+
+    builders = (
+        ("blocks", graphic_block_mesh),
+        ("cubes", meshing.cube_mesh),
+        ("faces", meshing.face_mesh),
+        ("greedy", meshing.greedy_mesh),
+    )
+
+    for name, builder in builders:
+
+        vertexes = 0
+        start = time.time()
+        for position, blocks in zip(positions, chunks):
+
+            vertexes += len(builder(blocks, position))
+
+        print_result("mesh " + name, count, time.time() - start)
+        print("mesh {}: {:.0f} vertexes/chunk".format(
+            name, vertexes / float(count)))
+
+
+def main():
+
+    benchmarks = {
+        "generation": benchmark_generation,
+        "meshing": benchmark_meshing,
+        "region": benchmark_region,
+    }
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "names",
+        nargs="*",
+        help="benchmarks to run: {} (all by default)".format(
+            ", ".join(sorted(benchmarks))))
+    parser.add_argument(
+        "-c", "--count", type=int, default=1000, help="number of chunks")
+
+    args = parser.parse_args()
+
+    for name in args.names:
+
+        if name not in benchmarks:
+
+            parser.error("unknown benchmark: {}".format(name))
+
+    for name in args.names or sorted(benchmarks):
+
+        benchmarks[name](args.count)
+
+
+if __name__ == "__main__":
+
+    main()
@@ -203,6 +203,35 @@ class FPSCamera(script.Controllable):
 
         return data.Point(self.x_pos, self.y_pos, next_z)
 
+    def horizontal_step(self, angle, step):
+        """Return horizontal step in the angle from view direction.
+
+        Args:
+            angle (float): angle from view direction in radians
+            step (float): step length
+
+        Return:
+            (float, float): x and z step
+        """
+
+        return (
+            step * sin(self.h_angle + angle),
+            step * cos(self.h_angle + angle)
+        )
+
+    def translate(self, x_step, y_step, z_step):
+        """Move camera by the steps.
+
+        Args:
+            x_step (float): x step
+            y_step (float): y step
+            z_step (float): z step
+        """
+
+        self.x_pos += x_step
+        self.y_pos += y_step
+        self.z_pos += z_step
+
     def jump(self):
         """Simulate camera jumping."""
 
@@ -409,10 +438,20 @@ class FPSCamera(script.Controllable):
         return trans_matrix
 
     def view_vec(self):
-        """Return view vector."""
+        """Return view vector.
+
+        Return:
+            matrix: view vector
+        """
 
-        # TODO: implementation
-        raise NotImplementedError
+        vec = matrix([
+            [cos(self.v_angle) * sin(self.h_angle)],
+            [- sin(self.v_angle)],
+            [cos(self.v_angle) * cos(self.h_angle)],
+            [1]
+        ])
+
+        return vec
 
     def horizontal_view_vec(self):
         """Return horizontal view vector.
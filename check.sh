@@ -4,6 +4,8 @@
 #
 
 MODULES="
+    arena.py
+    benchmark.py
     camera.py
     configuration.py
     controls.py
@@ -13,9 +15,12 @@ MODULES="
     functions.py
     graphics.py
     interfaces.py
+    meshing.py
     player.py
+    region.py
     script.py
-    shaders.py"
+    shaders.py
+    shared.py"
 CHECKER="flake8"
 PARAMS="--max-complexity 12"
 
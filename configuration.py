@@ -38,6 +38,14 @@ class EngineConfiguration(interfaces.Configuration):
         default_values = {
 
             "visibility": "22",
+            "integration_budget": "4",
+            "generator": "noise",
+            "mesh_mode": "faces",
+            "vertex_format": "float",
+            "draw_mode": "arrays",
+            "buffer_mode": "separate",
+            "seed": None,
+            "world_directory": None,
         }
 
         return default_values
@@ -68,6 +76,14 @@ class EngineConfiguration(interfaces.Configuration):
 
         section = "Main"
         self.set_value(config, section, "visibility")
+        self.set_value(config, section, "integration_budget")
+        self.set_value(config, section, "generator")
+        self.set_value(config, section, "mesh_mode")
+        self.set_value(config, section, "vertex_format")
+        self.set_value(config, section, "draw_mode")
+        self.set_value(config, section, "buffer_mode")
+        self.set_value(config, section, "seed")
+        self.set_value(config, section, "world_directory")
 
     def set_value(self, config, section, action):
         """Load configuration value and assign it.
@@ -2,20 +2,27 @@
 
 from __future__ import print_function
 
-from OpenGL.GL import GLfloat
 from OpenGL.GL import glBindBuffer
+from OpenGL.GL import glBindVertexArray
 from OpenGL.GL import glBufferData
+from OpenGL.GL import glBufferSubData
 from OpenGL.GL import glEnableVertexAttribArray
 from OpenGL.GL import glDisableVertexAttribArray
 from OpenGL.GL import glVertexAttribPointer
 from OpenGL.GL import glDrawArrays
+from OpenGL.GL import glDrawElements
 from OpenGL.GL import glPolygonMode
 from OpenGL.GL import glEnable
 from OpenGL.GL import glDisable
+from OpenGL.GL import glGetUniformLocation
+from OpenGL.GL import glUniform3f
 
 from OpenGL.GL import GL_ARRAY_BUFFER
+from OpenGL.GL import GL_ELEMENT_ARRAY_BUFFER
 from OpenGL.GL import GL_STATIC_DRAW
 from OpenGL.GL import GL_FLOAT
+from OpenGL.GL import GL_UNSIGNED_BYTE
+from OpenGL.GL import GL_UNSIGNED_INT
 from OpenGL.GL import GL_FALSE
 from OpenGL.GL import GL_TRIANGLES
 from OpenGL.GL import GL_CULL_FACE
@@ -24,20 +31,24 @@ from OpenGL.GL import GL_LINE
 from OpenGL.GL import GL_FILL
 from OpenGL.GL import GL_POINTS
 
-from multiprocessing import Lock
-from multiprocessing.sharedctypes import Array
-from multiprocessing.sharedctypes import copy
-from ctypes import c_float
-
 import collections
 import multiprocessing as mp
+import Queue
 import time
 import logging
 import os
 # import pprint
 import random
+import traceback
+
+import numpy
 
 import graphics
+import meshing
+import shaders
+import shared
+
+from data import BLOCK_DTYPE
 
 # from decorators import print_time
 # from decorators import print_pid
@@ -45,15 +56,24 @@ import graphics
 
 log = logging.getLogger(__name__)
 
+# finished mesh in shared buffer, border_start is the first vertex of
+# border faces and missing are border faces without neighbour chunk
+MeshInfo = collections.namedtuple(
+    "MeshInfo",
+    "buffer_index vertexes_count border_start missing position vertex_format"
+)
+
+# vertex attribute values and GL type for vertex formats
+VERTEX_ATTRIBUTES = {
+    "float": (3, GL_FLOAT),
+    "packed": (4, GL_UNSIGNED_BYTE),
+}
+
 # mpl = mp.log_to_stderr(5)
 
 # multiprocessing infrastructure
 ####################################
 
-lock = Lock()
-size = 250000
-shared_array = Array(c_float, size, lock=lock)
-
 
 def long_func(chunk_data):
 
@@ -66,59 +86,90 @@ def long_func(chunk_data):
     return chunk_data, positions
 
 
-def gl_vertexes_mp(chunk_id, chunk_vertexes):
-    """MP wrapper."""
+def mesh_mp(chunk_id, position, shape, slab_handle, slab, buffer_handle,
+            buffer_index, mode="faces", borders=None, vertex_format="float",
+            quads=False):
+    """MP wrapper, chunk mesh is built in one task.
 
-    shared_array.get_lock().acquire()
+    Chunk blocks are read from shared slab and vertexes are written into
+    shared buffer.
 
-    raw_array = shared_array.get_obj()
+    Return:
+        tuple: chunk ID, slab index, buffer index, MeshInfo or None and
+            error traceback or None
+    """
 
-    index = 0
-    for value in chunk_vertexes:
+    # pool has no error callback, so errors are sent back as results
+    try:
 
-        raw_array[index] = value
+        blocks = shared.slab_array(slab_handle, slab, BLOCK_DTYPE, shape)
+        vertexes, border_start = generate_mesh(
+            blocks, position, mode, borders, vertex_format, quads)
 
-        index += 1
+        shared.write_array(buffer_handle, vertexes, vertexes.dtype)
 
-    return chunk_id
+    except Exception:
 
+        return chunk_id, slab, buffer_index, None, traceback.format_exc()
 
-def generate_gl_vertexes(chunk_vertexes):
-    """Generate vertex data.
+    return chunk_id, slab, buffer_index, MeshInfo(
+        buffer_index,
+        len(vertexes),
+        border_start,
+        missing_faces(mode, borders),
+        position,
+        vertex_format
+    ), None
 
-    Args:
-        chunk_vertexes (list): vertexes of chunk
-    """
 
-    gl_vertexes = (GLfloat * len(chunk_vertexes))(*chunk_vertexes)
+def generate_mesh(blocks, position, mode="faces", borders=None,
+                  vertex_format="float", quads=False):
+    """Generate chunk mesh.
 
-    return gl_vertexes
+    Args:
+        blocks (numpy.ndarray): chunk blocks
+        position ((int, int)): X and Z coordinates of chunk
+        mode (str): mesh mode (cubes, faces, greedy)
+        borders (dict): horizontal face: neighbour layer mask or None
+        vertex_format (str): vertex format (float, packed)
+        quads (bool): 4 vertexes per face for indexed drawing
 
+    Return:
+        (numpy.ndarray, int): vertexes, first border vertex
+    """
 
-def vertexes_mp(chunk_id, positions):
-    """MP wrapper."""
+    vertexes, border_start = meshing.chunk_mesh(
+        blocks, position, mode, borders)
 
-    vertexes = generate_vertexes(positions)
+    if quads:
 
-    return chunk_id, vertexes
+        border_start = border_start // 6 * 4
 
+    return (
+        meshing.convert_vertexes(vertexes, position, vertex_format, quads),
+        border_start
+    )
 
-def generate_vertexes(positions):
 
-    vertexes = []
-    for position in positions:
+def missing_faces(mode, borders):
+    """Return border faces built without neighbour chunk.
 
-        vertexes.extend(graphics.GraphicBlock.get_vertexes(position))
+    Args:
+        mode (str): mesh mode (cubes, faces, greedy)
+        borders (dict): horizontal face: neighbour layer mask or None
 
-    return vertexes
+    Return:
+        tuple: faces
+    """
 
+    if mode == "cubes":
 
-def positions_mp(chunk_data):
-    """MP wrapper."""
+        return ()
 
-    positions = generate_vbo_blocks(chunk_data)
+    borders = borders or {}
 
-    return chunk_data, positions
+    return tuple(sorted(
+        face for face in meshing.BORDER_FACES if borders.get(face) is None))
 
 
 def generate_vbo_blocks(chunk_data):
@@ -128,18 +179,30 @@ def generate_vbo_blocks(chunk_data):
         chunk_data (Chunk): chunk data
     """
 
-    blocks_positions = []
-    for rel_pos, block in chunk_data.blocks.items():
+    return block_positions(
+        chunk_data.blocks,
+        (chunk_data.position.x, chunk_data.position.z)
+    )
 
-        block_position = (
-            chunk_data.position.x + rel_pos[0],
-            rel_pos[1],
-            chunk_data.position.z + rel_pos[2]
-        )
 
-        if block is not None:
+def block_positions(blocks, position):
+    """Return positions of solid blocks.
+
+    Args:
+        blocks (numpy.ndarray): chunk blocks
+        position ((int, int)): X and Z coordinates of chunk
 
-            blocks_positions.append(block_position)
+    Return:
+        list: (x, y, z) positions
+    """
+
+    x_indexes, y_indexes, z_indexes = numpy.nonzero(blocks)
+
+    blocks_positions = zip(
+        (x_indexes + position[0]).tolist(),
+        y_indexes.tolist(),
+        (z_indexes + position[1]).tolist()
+    )
 
     return blocks_positions
 
@@ -147,29 +210,29 @@ def generate_vbo_blocks(chunk_data):
 ######################################
 
 
-def generate_vbo(chunk_data):
-    """Generate VBO object.
+def upload_vbo(chunk_id, gl_vertexes, arenas=None):
+    """Upload vertexes to new VBO or to buffer arena.
 
     Args:
-        chunk_data (Chunk): chunk data
+        chunk_id (str): chunk ID
+        gl_vertexes (numpy.ndarray): vertexes
+        arenas (BufferArenas): buffer arenas or None for separate VBO
 
     Return:
         VboData: VBO data object
     """
 
-    positions = generate_vbo_blocks(chunk_data)
-
-    chunk_vertexes = generate_vertexes(positions)
+    if arenas is not None:
 
-    gl_vertexes = generate_gl_vertexes(chunk_vertexes)
+        return arenas.store(chunk_id, gl_vertexes)
 
-    chunk_vbo = graphics.VboData(chunk_data.chunk_id)
+    chunk_vbo = graphics.VboData(chunk_id)
     chunk_vbo.vertexes_count = len(gl_vertexes)
 
     glBindBuffer(GL_ARRAY_BUFFER, chunk_vbo.name)
     glBufferData(
         GL_ARRAY_BUFFER,
-        len(gl_vertexes) * 4,
+        gl_vertexes.nbytes,
         gl_vertexes,
         GL_STATIC_DRAW)
     glBindBuffer(GL_ARRAY_BUFFER, 0)
@@ -177,185 +240,235 @@ def generate_vbo(chunk_data):
     return chunk_vbo
 
 
+def generate_vbo(chunk_data, mesh_mode="faces", borders=None,
+                 vertex_format="float", quads=False, arenas=None):
+    """Generate VBO object.
+
+    Args:
+        chunk_data (Chunk): chunk data
+        mesh_mode (str): mesh mode (cubes, faces, greedy)
+        borders (dict): horizontal face: neighbour layer mask or None
+        vertex_format (str): vertex format (float, packed)
+        quads (bool): 4 vertexes per face for indexed drawing
+        arenas (BufferArenas): buffer arenas or None for separate VBO
+
+    Return:
+        VboData: VBO data object
+    """
+
+    position = (chunk_data.position.x, chunk_data.position.z)
+    gl_vertexes, border_start = generate_mesh(
+        chunk_data.blocks, position, mesh_mode, borders, vertex_format, quads)
+
+    chunk_vbo = upload_vbo(chunk_data.chunk_id, gl_vertexes, arenas)
+    chunk_vbo.origin = position
+    chunk_vbo.border_start = border_start
+    chunk_vbo.missing = missing_faces(mesh_mode, borders)
+
+    return chunk_vbo
+
+
 class VboCreator(object):
-    """Create VBO data object."""
+    """Create VBO data object.
 
-    def __init__(self, vbo_list, workers=2):
+    Every chunk is meshed in one worker task. Chunk blocks are sent to
+    workers in slabs of shared memory and vertexes come back in shared
+    buffers.
 
-        self.orig_list = vbo_list
+    Pool callbacks put finished meshes into a completion queue and the
+    main thread takes only them, every task goes from MESHING to READY
+    state and it is removed after its VBO is built.
+    """
 
-        self.active_tasks = []
-        self.active_subtasks = {}
+    # task states
+    MESHING = "meshing"
+    READY = "ready"
 
-        self.prepared_vbos = {}
+    # number of chunks in processing
+    slab_count = 16
 
+    def __init__(self, vbo_list, workers=2, mesh_mode="faces",
+                 vertex_format="float", quads=False):
+
+        self.orig_list = vbo_list
+        self.mesh_mode = mesh_mode
+        self.vertex_format = vertex_format
+        self.quads = quads
+        # BufferArenas for new VBOs or None for separate VBOs
+        self.arenas = None
+
+        # chunk ID: task state
+        self.task_states = {}
+
+        # meshes from pool callbacks, (chunk ID, mesh)
+        self.done_queue = Queue.Queue()
+        # (chunk ID, mesh) waiting for building
         self.ready_vbos = collections.deque()
 
-        self.vbo_parts = {
-            # "vbo_id": {
-            #     "parts1": (1, 2,),
-            #     "parts2": ("a", "b", "d"),
-            #     "parts3": None,
-            # },
-        }
+        # shared memory for chunk blocks
+        self.slabs = None
+        # shared memory for vertexes
+        self.vertex_buffers = shared.BufferPool()
 
         self.pool = mp.Pool(workers)
 
-    def add_task(self, chunk_id):
+    def get_slabs(self, blocks):
+        """Return slab pool for chunk blocks.
 
-        log.debug("New VboCreator task: {}".format(chunk_id))
-
-        self.active_tasks.append(chunk_id)
+        Args:
+            blocks (numpy.ndarray): chunk blocks
 
-    def task_exists(self, chunk_id):
+        Return:
+            shared.SlabPool: slab pool
+        """
 
-        if chunk_id in self.active_tasks:
+        if self.slabs is None:
 
-            return True
+            self.slabs = shared.SlabPool(self.slab_count, blocks.nbytes)
 
-        else:
+        return self.slabs
 
-            return False
+    def add_task(self, chunk_id):
 
-    def create_subtasks(self, vbo_id):
+        log.debug("New VboCreator task: {}".format(chunk_id))
 
-        self.active_subtasks[vbo_id] = {
-            "positions": None,
-            "vertexes": None,
-            "gl_vertexes": None,
-        }
+        self.task_states[chunk_id] = self.MESHING
 
-    def set_subtask_state(self, vbo_id, subtask, state):
+    def task_exists(self, chunk_id):
 
-        self.active_subtasks[vbo_id][subtask] = state
+        return chunk_id in self.task_states
 
-    def create_parts(self, vbo_id):
+    def add_ready_vbo(self, uid, mesh):
 
-        self.vbo_parts[vbo_id] = {
-            "positions": None,
-            "vertexes": None,
-            "gl_vertexes": None,
-        }
+        self.task_states[uid] = self.READY
+        self.ready_vbos.append((uid, mesh))
 
-    def delete_parts(self, vbo_id):
+    def collect_done(self):
+        """Move finished meshes from the completion queue."""
 
-        del self.vbo_parts[vbo_id]
+        while True:
 
-    def add_parts(self, vbo_id, section, data):
+            try:
 
-        self.vbo_parts[vbo_id][section] = data
+                uid, mesh = self.done_queue.get_nowait()
 
-    def add_ready_vbo(self, uid):
+            except Queue.Empty:
 
-        self.ready_vbos.append(uid)
+                break
 
-    def check_parts(self):
+            if mesh is None:
 
-        # TODO: refactoring
+                # failed task, the chunk can be sent again
+                del self.task_states[uid]
 
-        log.debug("Active VboCreator tasks: {}".format(len(self.active_tasks)))
+                continue
 
-        for vbo_id, value in self.vbo_parts.items():
+            self.add_ready_vbo(uid, mesh)
 
-            all_parts = []
-            for part_name, data in value.items():
+    def create(self, chunk_data, borders=None):
+        """Send chunk to meshing.
 
-                if data:
+        Args:
+            chunk_data (Chunk): chunk data
+            borders (dict): horizontal face: neighbour layer mask or None
+        """
 
-                    if (part_name == "positions"
-                            and not self.active_subtasks[vbo_id]["vertexes"]):
+        chunk_id = chunk_data.chunk_id
+        if self.task_exists(chunk_id):
 
-                        positions = data
-                        self.pool.apply_async(
-                            vertexes_mp,
-                            args=(vbo_id, positions),
-                            callback=self.vertexes_done
-                        )
-                        self.set_subtask_state(vbo_id, "vertexes", "running")
+            return
 
-                        all_parts.append(False)
+        blocks = chunk_data.blocks
+        slabs = self.get_slabs(blocks)
 
-                    elif (part_name == "vertexes"
-                            and not self.active_subtasks[vbo_id]["gl_vertexes"]):  # NOQA
+        # all slabs are used, the chunk waits for the next try
+        slab = slabs.checkout()
+        if slab is None:
 
-                        vertexes = data
-                        self.pool.apply_async(
-                            gl_vertexes_mp,
-                            args=(vbo_id, vertexes),
-                            callback=self.gl_vertexes_done
-                        )
-                        self.set_subtask_state(vbo_id, "gl_vertexes", "running")  # NOQA
+            return
 
-                        all_parts.append(False)
+        slabs.slab(slab, BLOCK_DTYPE, blocks.shape)[...] = blocks
+        buffer_index = self.vertex_buffers.checkout()
 
-                    else:
+        self.add_task(chunk_id)
 
-                        all_parts.append(True)
+        self.pool.apply_async(
+            mesh_mp,
+            args=(
+                chunk_id,
+                (chunk_data.position.x, chunk_data.position.z),
+                blocks.shape,
+                slabs.handle,
+                slab,
+                self.vertex_buffers.handle(buffer_index),
+                buffer_index,
+                self.mesh_mode,
+                borders,
+                self.vertex_format,
+                self.quads
+            ),
+            callback=self.mesh_done
+        )
 
-                else:
+    def build_ready_vbos(self, deadline=None):
+        """Build ready VBOs until the deadline.
 
-                    all_parts.append(False)
+        At least one ready VBO is built.
 
-            # print(all_parts)
-            if all(all_parts):
+        Args:
+            deadline (float): time.time() value, build all without it
+        """
 
-                if vbo_id not in self.ready_vbos:
+        while len(self.ready_vbos) > 0:
 
-                    self.add_ready_vbo(vbo_id)
+            new_vbo, mesh = self.ready_vbos.popleft()
 
-    def create(self, chunk_data):
+            self.build_vbo(new_vbo, mesh)
 
-        chunk_id = chunk_data.chunk_id
-        if self.task_exists(chunk_id):
+            log.debug("VboCreator task {} done.".format(new_vbo))
 
-            return
+            if deadline is not None and time.time() >= deadline:
 
-        self.add_task(chunk_id)
-        self.create_subtasks(chunk_id)
-        self.create_parts(chunk_id)
+                break
 
-        self.pool.apply_async(
-            positions_mp,
-            args=(chunk_data,),
-            callback=self.positions_done
-        )
-        self.set_subtask_state(chunk_id, "positions", "running")
+    def build_vbo(self, uid, mesh):
 
-    def build_ready_vbos(self):
+        dtype, values = meshing.VERTEX_FORMATS[mesh.vertex_format]
 
-        if len(self.ready_vbos) > 0:
+        buffer_index = mesh.buffer_index
+        gl_vertexes = self.vertex_buffers.array(
+            buffer_index, dtype, mesh.vertexes_count * values)
 
-            new_vbo = self.ready_vbos.popleft()
+        chunk_vbo = upload_vbo(
+            uid,
+            gl_vertexes.reshape(mesh.vertexes_count, values),
+            self.arenas)
+        chunk_vbo.origin = mesh.position
+        chunk_vbo.border_start = mesh.border_start
+        chunk_vbo.missing = mesh.missing
 
-            self.build_vbo(
-                new_vbo,
-                self.vbo_parts[new_vbo]["vertexes"],
-                self.vbo_parts[new_vbo]["gl_vertexes"],
-            )
+        self.vertex_buffers.release(buffer_index)
 
-            self.delete_parts(new_vbo)
+        del self.task_states[uid]
+        self.replace_vbo(chunk_vbo)
 
-            log.debug("VboCreator task {} done.".format(new_vbo))
+    def replace_vbo(self, chunk_vbo):
+        """Add new VBO in place of the old VBO of the chunk.
 
-    def build_vbo(self, uid, vertexes, gl_vertexes):
+        Args:
+            chunk_vbo (VboData): new VBO data object
+        """
 
-        chunk_vertexes = vertexes
-        gl_vertexes = gl_vertexes
+        for index, old_vbo in enumerate(self.orig_list):
 
-        vertexes_count = len(chunk_vertexes)
+            if old_vbo.chunk_id == chunk_vbo.chunk_id:
 
-        chunk_vbo = graphics.VboData(uid)
-        chunk_vbo.vertexes_count = vertexes_count
+                chunk_vbo.render = old_vbo.render
+                self.orig_list[index] = chunk_vbo
+                old_vbo.delete()
 
-        glBindBuffer(GL_ARRAY_BUFFER, chunk_vbo.name)
-        glBufferData(
-            GL_ARRAY_BUFFER,
-            vertexes_count * 4,
-            gl_vertexes,
-            GL_STATIC_DRAW)
-        glBindBuffer(GL_ARRAY_BUFFER, 0)
+                return
 
-        self.active_tasks.remove(uid)
         self.orig_list.append(chunk_vbo)
 
     def wait_for_procs(self):
@@ -363,43 +476,37 @@ class VboCreator(object):
         self.pool.close()
         self.pool.join()
 
-    def positions_done(self, arg):
-
-        log.debug("positions done")
+        if self.slabs is not None:
 
-        chunk_data = arg[0]
-        positions = arg[1]
+            self.slabs.close()
+            self.slabs = None
 
-        self.add_parts(chunk_data.chunk_id, "positions", positions)
-        self.set_subtask_state(chunk_data.chunk_id, "positions", "done")
+        self.vertex_buffers.close()
 
-    def vertexes_done(self, arg):
+    def mesh_done(self, arg):
 
-        log.debug("vertexes done")
+        log.debug("mesh done")
 
         uid = arg[0]
-        vertexes = arg[1]
-
-        self.add_parts(uid, "vertexes", vertexes)
-        self.set_subtask_state(uid, "vertexes", "done")
-
-    def gl_vertexes_done(self, arg):
+        slab = arg[1]
+        buffer_index = arg[2]
+        mesh = arg[3]
+        error = arg[4]
 
-        log.debug("gl_vertexes done")
+        self.slabs.release(slab)
 
-        uid = arg
-        c_array = copy(shared_array.get_obj())
+        if error is not None:
 
-        shared_array.get_lock().release()
+            log.error("VboCreator task {} failed:\n{}".format(uid, error))
+            self.vertex_buffers.release(buffer_index)
 
-        self.add_parts(uid, "gl_vertexes", c_array)
-        self.set_subtask_state(uid, "gl_vertexes", "done")
+        self.done_queue.put((uid, mesh))
 
-    def update(self):
+    def update(self, deadline=None):
 
-        self.check_parts()
+        self.collect_done()
 
-        self.build_ready_vbos()
+        self.build_ready_vbos(deadline)
 
 
 class Renderer(object):
@@ -411,12 +518,47 @@ class Renderer(object):
 
         self.world = world
         self.visibility = 22
+        # chunks are unloaded farther than they are generated to avoid
+        # repeated loading and unloading on the border
         self.chunk_gen_distance = self.visibility * 1.2
+        self.chunk_unload_distance = self.visibility * 1.6
+
+        # time for integration of new data per frame in milliseconds
+        self.integration_budget = 4.0
+
+        # chunk mesh mode: cubes (all blocks), faces (faces next to air),
+        # greedy (merged faces next to air)
+        self.mesh_mode = "faces"
+        # vertex format: float (world positions), packed (uint8 positions
+        # in chunk with face number)
+        self.vertex_format = "float"
+        # draw mode: arrays (triangles), elements (quads with shared
+        # index buffer)
+        self.draw_mode = "arrays"
+
+        # QuadIndexBuffer for elements draw mode, created with first render
+        self.quad_indexes = None
+
+        # buffer mode: separate (VBO per chunk), arena (VBOs in large
+        # buffers drawn with one call per buffer)
+        self.buffer_mode = "separate"
+        self.arenas = None
+
+        # VAOs are used with OpenGL 3 capabilities
+        self.use_vaos = False
+
+        # uniform locations, (program, name): location
+        self.uniform_locations = {}
 
         # VboData list for vertex buffer objects
         self.vbos = []
 
-        self.vbo_creator = VboCreator(self.vbos, workers=2)
+        self.vbo_creator = VboCreator(
+            self.vbos,
+            workers=2,
+            mesh_mode=self.mesh_mode,
+            vertex_format=self.vertex_format
+        )
 
         # external configuration
         self.configuration = configuration.get_values()
@@ -437,6 +579,103 @@ class Renderer(object):
             return
 
         self.visibility = int(self.configuration["visibility"])
+        self.integration_budget = float(
+            self.configuration["integration_budget"])
+        self.chunk_gen_distance = self.visibility * 1.2
+        self.chunk_unload_distance = self.visibility * 1.6
+
+        self.set_mesh_mode(self.configuration["mesh_mode"])
+        self.set_vertex_format(self.configuration["vertex_format"])
+        self.set_draw_mode(self.configuration["draw_mode"])
+        self.set_buffer_mode(self.configuration["buffer_mode"])
+
+    def set_capabilities(self, capabilities):
+        """Set rendering according to OpenGL capabilities.
+
+        Args:
+            capabilities (str): normal, old or legacy
+        """
+
+        self.use_vaos = capabilities in ("normal", "old")
+
+    def set_mesh_mode(self, mode):
+        """Set mesh mode for new VBOs.
+
+        Args:
+            mode (str): mesh mode (cubes, faces, greedy)
+        """
+
+        self.mesh_mode = mode
+        self.vbo_creator.mesh_mode = mode
+
+    def set_vertex_format(self, vertex_format):
+        """Set vertex format for new VBOs.
+
+        Args:
+            vertex_format (str): vertex format (float, packed)
+        """
+
+        self.vertex_format = vertex_format
+        self.vbo_creator.vertex_format = vertex_format
+
+    def set_draw_mode(self, mode):
+        """Set draw mode for new VBOs.
+
+        Args:
+            mode (str): draw mode (arrays, elements)
+        """
+
+        self.draw_mode = mode
+        self.vbo_creator.quads = mode == "elements"
+
+    def set_buffer_mode(self, mode):
+        """Set buffer mode for new VBOs.
+
+        Arenas are used only with float vertex format and arrays draw
+        mode, packed vertexes need chunk origin for every draw.
+
+        Args:
+            mode (str): buffer mode (separate, arena)
+        """
+
+        if mode == "arena" and (
+                self.vertex_format != "float" or self.draw_mode != "arrays"):
+
+            log.warning("Buffer arena needs float format and arrays mode.")
+            mode = "separate"
+
+        self.buffer_mode = mode
+
+        if mode == "arena":
+
+            dtype, values = meshing.VERTEX_FORMATS[self.vertex_format]
+            self.arenas = graphics.BufferArenas(
+                numpy.dtype(dtype).itemsize * values)
+
+        else:
+
+            self.arenas = None
+
+        self.vbo_creator.arenas = self.arenas
+
+    def shader_name(self, rendering_type):
+        """Return name of shader for the vertex format.
+
+        Args:
+            rendering_type (str): fill or lines
+
+        Return:
+            str: shader name
+        """
+
+        names = {
+            ("float", "fill"): "test",
+            ("float", "lines"): "lines",
+            ("packed", "fill"): "packed",
+            ("packed", "lines"): "packed_lines",
+        }
+
+        return names[self.vertex_format, rendering_type]
 
     def ground_collision(self, point):
         """Return ground collision value as boolean.
@@ -450,14 +689,120 @@ class Renderer(object):
 
         return self.world.collision(point)
 
-    def prepare_new_chunks(self, position):
+    def ground_collisions(self, points):
+        """Return ground collisions for more points at once.
+
+        Args:
+            points (numpy.ndarray): points with shape (N, 3)
+
+        Return:
+            numpy.ndarray: collision for every point as bool
+        """
+
+        return self.world.collide_many(points)
+
+    def blocks_at(self, x_indexes, y_indexes, z_indexes):
+        """Return block types on world block positions.
+
+        Args:
+            x_indexes (numpy.ndarray): x positions of blocks as int
+            y_indexes (numpy.ndarray): y positions of blocks as int
+            z_indexes (numpy.ndarray): z positions of blocks as int
+
+        Return:
+            numpy.ndarray: block types
+        """
+
+        return self.world.blocks_at(x_indexes, y_indexes, z_indexes)
+
+    def pick_block(self, position, direction, distance):
+        """Return the first solid block in the direction.
+
+        Args:
+            position (Point): Ray origin with inverse z axis.
+            direction (matrix): Camera view vector.
+            distance (float): Max distance.
+
+        Return:
+            (BlockInfo, normal) or None
+        """
+
+        direction = direction.tolist()
+
+        return self.world.raycast(
+            (position.x, position.y, position.z),
+            (direction[0][0], direction[1][0], - direction[2][0]),
+            distance
+        )
+
+    def prepare_new_chunks(self, position, direction=None):
         """Generate new chunks around the position.
 
         Args:
             position (Point): Centre.
+            direction ((float, float)): View direction (x, z) with inverse
+                z axis, chunks in front are generated first.
         """
 
-        self.world.generate_chunks(position, self.chunk_gen_distance)
+        self.world.generate_chunks(
+            position, self.chunk_gen_distance, direction)
+
+    def unload_chunks(self, position):
+        """Unload far chunks and free their VBOs.
+
+        Args:
+            position (Point): Centre.
+        """
+
+        self.world.unload_chunks(position, self.chunk_unload_distance)
+
+        self.delete_vbos()
+
+    def delete_vbos(self):
+        """Delete VBOs without loaded chunk."""
+
+        chunk_ids = set(chunk.chunk_id for chunk in self.world.chunks.values())
+
+        kept_vbos = []
+        for vbo in self.vbos:
+
+            if vbo.chunk_id in chunk_ids:
+
+                kept_vbos.append(vbo)
+
+            else:
+
+                vbo.delete()
+
+        if len(kept_vbos) < len(self.vbos):
+
+            log.debug("Deleted VBOs: {}".format(
+                len(self.vbos) - len(kept_vbos)))
+
+        # VBO creator keeps reference to the list
+        self.vbos[:] = kept_vbos
+
+        if self.arenas is not None:
+
+            self.arenas.release_empty()
+
+    def delete_buffers(self):
+        """Delete all GL buffers of the renderer."""
+
+        for vbo in self.vbos:
+
+            vbo.delete()
+
+        del self.vbos[:]
+
+        if self.arenas is not None:
+
+            self.arenas.delete()
+
+        if self.quad_indexes is not None:
+
+            self.quad_indexes.delete()
+            self.quad_indexes = None
 
     def print_visibility(self):
         """Print visibility for all chunks in world."""
@@ -487,9 +832,12 @@ class Renderer(object):
                     vbo.render = chunk.visible
 
     def data_update(self):
+        """Integrate finished chunks and VBOs in the time budget."""
 
-        self.vbo_creator.update()
-        self.world.update_chunks()
+        deadline = time.time() + self.integration_budget / 1000.0
+
+        self.vbo_creator.update(deadline)
+        self.world.update_chunks(deadline)
 
     def create_vbos(self):
         """Create necessary VBOs."""
@@ -502,7 +850,78 @@ class Renderer(object):
 
             else:
 
-                self.vbo_creator.create(chunk)
+                self.vbo_creator.create(chunk, self.chunk_borders(position))
+
+    def chunk_borders(self, position):
+        """Return neighbour layers next to the chunk.
+
+        Args:
+            position ((int, int)): chunk position/key (x, z)
+
+        Return:
+            dict: horizontal face: neighbour layer mask or None
+        """
+
+        return meshing.border_layers(self.world.neighbour_blocks(position))
+
+    def remesh_borders(self):
+        """Rebuild border faces of VBOs with changed neighbour chunks.
+
+        Only the border faces at the end of the buffer are replaced. A new
+        neighbour hides border faces and an unloaded neighbour shows them
+        again, so the new border faces fit in the place of the old ones
+        only if no neighbour was unloaded since the last build. Otherwise
+        the chunk is meshed again and the old VBO is drawn meanwhile.
+        """
+
+        vbos = dict((vbo.chunk_id, vbo) for vbo in self.vbos)
+
+        for position, chunk in self.world.chunks.items():
+
+            vbo = vbos.get(chunk.chunk_id)
+            if vbo is None:
+
+                continue
+
+            # missing faces are checked before building neighbour layers
+            neighbours = self.world.neighbour_blocks(position)
+            missing = missing_faces(self.mesh_mode, dict(
+                (face, neighbours[direction])
+                for face, direction in meshing.BORDER_FACES.items()
+            ))
+
+            if (set(missing) == set(vbo.missing)
+                    or self.vbo_creator.task_exists(chunk.chunk_id)):
+
+                continue
+
+            borders = meshing.border_layers(neighbours)
+            vertexes = meshing.convert_vertexes(
+                meshing.border_mesh(
+                    chunk.blocks, position, self.mesh_mode, borders),
+                position,
+                self.vertex_format,
+                self.vbo_creator.quads
+            )
+
+            if vbo.border_start + len(vertexes) > vbo.vertexes_count:
+
+                # border faces grew with an unloaded neighbour, the old
+                # VBO is drawn until the new mesh replaces it
+                self.vbo_creator.create(chunk, borders)
+
+                continue
+
+            glBindBuffer(GL_ARRAY_BUFFER, vbo.name)
+            glBufferSubData(
+                GL_ARRAY_BUFFER,
+                (vbo.first + vbo.border_start) * vertexes.strides[0],
+                vertexes.nbytes,
+                vertexes)
+            glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+            vbo.vertexes_count = vbo.border_start + len(vertexes)
+            vbo.missing = missing
 
     def vbo_exists(self, chunk_id):
         """Check VBO existence for the chunk ID.
@@ -528,7 +947,14 @@ class Renderer(object):
         block_counter = 0
         for pos, chunk in self.world.chunks.items():
 
-            chunk_vbo = generate_vbo(chunk)
+            chunk_vbo = generate_vbo(
+                chunk,
+                self.mesh_mode,
+                self.chunk_borders(pos),
+                self.vertex_format,
+                self.vbo_creator.quads,
+                self.arenas
+            )
 
             self.vbos.append(chunk_vbo)
 
@@ -544,23 +970,154 @@ class Renderer(object):
         print("+" * 40)
         print("")
 
-    def render(self):
-        """Render game world."""
+    def render(self, program=None):
+        """Render game world.
+
+        Args:
+            program (int): current shader program
+        """
+
+        renderers = {
+            "float": self.render_float,
+            "packed": self.render_packed,
+        }
+
+        if self.arenas is not None:
+
+            self.render_arenas()
+
+            return
+
+        if self.draw_mode == "elements":
+
+            if self.quad_indexes is None:
+
+                self.quad_indexes = graphics.QuadIndexBuffer()
+
+            # the buffer stays bound during rendering without VAOs
+            self.quad_indexes.bind()
+
+        renderers[self.vertex_format](program)
+
+        if self.draw_mode == "elements":
+
+            glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+
+    def uniform_location(self, program, name):
+        """Return cached location of the uniform in the program.
+
+        Args:
+            program (int): shader program
+            name (str): uniform name
+
+        Return:
+            int: uniform location
+        """
+
+        key = (int(program), name)
+        if key not in self.uniform_locations:
+
+            self.uniform_locations[key] = glGetUniformLocation(program, name)
+
+        return self.uniform_locations[key]
+
+    def bind_vertexes(self, holder):
+        """Bind vertexes of VBO or arena for drawing.
+
+        VAO is created with the first draw if the context supports it.
+
+        Args:
+            holder (VboData): object with buffer name and VAO
+        """
+
+        values, gl_type = VERTEX_ATTRIBUTES[self.vertex_format]
+
+        if self.use_vaos:
+
+            if holder.vao is None:
+
+                index_buffer = None
+                if self.draw_mode == "elements":
+
+                    index_buffer = self.quad_indexes.name
+
+                holder.vao = graphics.create_vao(
+                    holder.name, values, gl_type, index_buffer)
+
+            glBindVertexArray(holder.vao)
+
+        else:
+
+            glBindBuffer(GL_ARRAY_BUFFER, holder.name)
+            glEnableVertexAttribArray(shaders.VERTEX_ATTRIBUTE)
+            glVertexAttribPointer(
+                shaders.VERTEX_ATTRIBUTE, values, gl_type, GL_FALSE, 0, None)
+
+    def unbind_vertexes(self):
+        """Unbind vertexes after drawing."""
+
+        if self.use_vaos:
+
+            glBindVertexArray(0)
+
+        else:
+
+            glDisableVertexAttribArray(shaders.VERTEX_ATTRIBUTE)
+            glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def draw_vbo(self, vbo):
+        """Draw triangles of the bound VBO in the draw mode."""
+
+        if self.draw_mode == "elements":
+
+            quads = vbo.vertexes_count // 4
+            self.quad_indexes.reserve(quads)
+            glDrawElements(GL_TRIANGLES, quads * 6, GL_UNSIGNED_INT, None)
+
+        else:
+
+            glDrawArrays(GL_TRIANGLES, 0, vbo.vertexes_count)
+
+    def render_arenas(self):
+        """Render visible VBOs with one draw call for every arena."""
+
+        for buffer_arena in self.arenas.arenas:
+
+            self.bind_vertexes(buffer_arena)
+            buffer_arena.draw()
+
+        self.unbind_vertexes()
+
+    def render_float(self, program):
+        """Render VBOs with float world positions."""
 
         for vbo in self.vbos:
 
             if vbo.render:
 
-                glBindBuffer(GL_ARRAY_BUFFER, vbo.name)
-                glEnableVertexAttribArray(0)
-                glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, 0, None)
+                self.bind_vertexes(vbo)
+                self.draw_vbo(vbo)
+
+        self.unbind_vertexes()
+
+    def render_packed(self, program):
+        """Render VBOs with packed positions in chunks.
+
+        Chunk position is set to the chunk_origin uniform for every VBO.
+        """
+
+        origin = self.uniform_location(program, "chunk_origin")
+
+        for vbo in self.vbos:
+
+            if vbo.render:
+
+                glUniform3f(origin, vbo.origin[0], 0.0, vbo.origin[1])
+
+                self.bind_vertexes(vbo)
+                self.draw_vbo(vbo)
 
-                glDrawArrays(
-                    GL_TRIANGLES,
-                    0,
-                    vbo.vertexes_count)
-                glDisableVertexAttribArray(0)
-                glBindBuffer(GL_ARRAY_BUFFER, 0)
+        self.unbind_vertexes()
 
     @staticmethod
     def set_lines():
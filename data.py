@@ -5,11 +5,20 @@
 
 import uuid
 import collections
+import heapq
+import itertools
+import time
 import logging
 import multiprocessing as mp
 
+from math import ceil
+from math import floor
 from math import sqrt
 
+import numpy
+
+import shared
+
 # from decorators import print_time
 from functions import generate_chunk
 from functions import generate_chunk_mp
@@ -17,109 +26,452 @@ from functions import generate_chunk_mp
 
 log = logging.getLogger(__name__)
 
+# key of chunk in world, x and z position of chunk
+ChunkKey = collections.namedtuple("ChunkKey", "x z")
+
+# block types stored in chunk arrays
+BLOCK_DTYPE = numpy.uint8
+AIR = 0
+SOLID = 1
+
+
+# cached chunk grid offsets for radius
+grid_offsets = {}
+
+
+def chunk_offsets(radius):
+    """Return chunk grid offsets in the radius sorted nearest-first.
+
+    Args:
+        radius (int): radius in chunks
+
+    Return:
+        numpy.ndarray: offsets (x, z) with shape (N, 2)
+    """
+
+    if radius not in grid_offsets:
+
+        steps = numpy.arange(-radius, radius + 1)
+        offsets = numpy.array(
+            numpy.meshgrid(steps, steps, indexing="ij")).reshape(2, -1).T
+
+        squares = (offsets ** 2).sum(axis=1)
+        offsets = offsets[squares <= radius ** 2]
+        squares = squares[squares <= radius ** 2]
+
+        order = numpy.argsort(squares, kind="mergesort")
+        grid_offsets[radius] = offsets[order]
+
+    return grid_offsets[radius]
+
 
 class ChunkCreator(object):
+    """Create chunks asynchronously.
+
+    New tasks wait in a priority queue ordered by distance from the centre
+    (usually the player) and only a limited number of tasks is sent to
+    workers at once. Tasks out of the distance are dropped before sending.
+
+    Workers write blocks into slabs of shared memory and only slab indexes
+    are sent back.
+
+    Args:
+        chunk_dict (dict): dictionary for new chunks
+        workers (int): number of worker processes
+        generator (str): chunk generator mode
+        seed (int): world seed
+    """
+
+    # seconds before a failed chunk can be created again
+    failed_task_delay = 10.0
 
-    def __init__(self, chunk_dict, workers=2):
+    def __init__(self, chunk_dict, workers=2, generator="random", seed=None):
 
         self.orig_dict = chunk_dict
 
-        self.active_tasks = []
+        self.generator = generator
+        self.seed = seed
+
+        # waiting tasks, position: chunk type
+        self.pending_tasks = {}
+        # heap of (priority, order, position)
+        self.task_queue = []
+        self.task_order = itertools.count()
+
+        # tasks sent to workers
+        self.active_tasks = set()
+        self.max_active_tasks = workers * 2
+
+        self.centre = None
+        self.max_distance = None
+        # view direction (x, z) and its weight in priorities
+        self.direction = None
+        self.view_bias = 0.0
+
+        # shared memory for blocks, one slab for every active task
+        self.slabs = None
+
         self.prepared_chunks = {}
         self.ready_chunks = collections.deque()
+        # positions of failed tasks
+        self.failed_chunks = collections.deque()
+        # position: time of the next try
+        self.failed_positions = {}
 
         self.pool = mp.Pool(workers)
 
-    def add_task(self, chunk_position):
+    def get_slabs(self, chunk_type):
+        """Return slab pool for blocks of the chunk type.
+
+        Args:
+            chunk_type (Chunk): type of chunk
+
+        Return:
+            shared.SlabPool: slab pool
+        """
+
+        if self.slabs is None:
+
+            self.slabs = shared.SlabPool(
+                self.max_active_tasks,
+                chunk_type.size ** 2 * chunk_type.height *
+                numpy.dtype(BLOCK_DTYPE).itemsize
+            )
+
+        return self.slabs
+
+    def add_task(self, chunk_type, chunk_position):
 
         log.debug("New ChunkCreator task: {}".format(chunk_position))
 
-        self.active_tasks.append(chunk_position)
+        self.pending_tasks[chunk_position] = chunk_type
+        self.push_task(chunk_type, chunk_position)
+
+    def push_task(self, chunk_type, chunk_position):
+
+        heapq.heappush(self.task_queue, (
+            self.task_priority(chunk_type, chunk_position),
+            next(self.task_order),
+            chunk_position
+        ))
 
     def task_exists(self, position):
 
-        if position in self.active_tasks:
+        return position in self.pending_tasks or position in self.active_tasks
+
+    def task_distance(self, chunk_type, chunk_position):
+        """Return distance of chunk centre from the centre.
+
+        Args:
+            chunk_type (Chunk): type of chunk
+            chunk_position (int, int): X and Z coordinates
+
+        Return:
+            float: distance
+        """
+
+        if self.centre is None:
+
+            return 0.0
+
+        return self.centre.chunk_distance(Point(
+            chunk_position[0] + chunk_type.size / 2.0,
+            0,
+            chunk_position[1] + chunk_type.size / 2.0
+        ))
+
+    def task_priority(self, chunk_type, chunk_position):
+        """Return priority of the task.
+
+        Chunks in the view direction are preferred the same way as in
+        BlockWorld.find_necessary_chunks.
+
+        Args:
+            chunk_type (Chunk): type of chunk
+            chunk_position (int, int): X and Z coordinates
+
+        Return:
+            float: priority, lower is sooner
+        """
+
+        priority = self.task_distance(chunk_type, chunk_position)
+
+        if self.centre is None or self.direction is None:
+
+            return priority
+
+        x_dist = chunk_position[0] + chunk_type.size / 2.0 - self.centre.x
+        z_dist = chunk_position[1] + chunk_type.size / 2.0 - self.centre.z
+        length = sqrt(self.direction[0] ** 2 + self.direction[1] ** 2) or 1.0
+
+        return priority - self.view_bias * (
+            x_dist * self.direction[0] + z_dist * self.direction[1]) / length
+
+    def is_stale(self, chunk_type, chunk_position):
+        """Return True if the task is not necessary anymore."""
+
+        if chunk_position in self.orig_dict:
 
             return True
 
-        else:
+        if self.max_distance is None:
 
             return False
 
+        return (self.task_distance(chunk_type, chunk_position)
+                > self.max_distance)
+
+    def set_centre(self, point, distance, direction=None, view_bias=0.0):
+        """Set new centre and reorder waiting tasks.
+
+        Args:
+            point (Point): centre point
+            distance (float): max distance for tasks
+            direction ((float, float)): view direction (x, z) for
+                preferring chunks in front of the point
+            view_bias (float): weight of the view direction
+        """
+
+        self.centre = Point(point.x, point.y, point.z)
+        self.max_distance = distance
+        self.direction = direction
+        self.view_bias = view_bias
+
+        self.task_queue = []
+        for position, chunk_type in list(self.pending_tasks.items()):
+
+            if self.is_stale(chunk_type, position):
+
+                del self.pending_tasks[position]
+
+            else:
+
+                self.push_task(chunk_type, position)
+
+    def dispatch_tasks(self):
+        """Send the most important tasks to workers."""
+
+        while (self.task_queue
+               and len(self.active_tasks) < self.max_active_tasks):
+
+            position = heapq.heappop(self.task_queue)[2]
+
+            chunk_type = self.pending_tasks.pop(position, None)
+            if chunk_type is None:
+
+                continue
+
+            if self.is_stale(chunk_type, position):
+
+                log.debug("Dropped ChunkCreator task: {}".format(position))
+                continue
+
+            slabs = self.get_slabs(chunk_type)
+            slab = slabs.checkout()
+            if slab is None:
+
+                self.pending_tasks[position] = chunk_type
+                self.push_task(chunk_type, position)
+                break
+
+            self.active_tasks.add(position)
+
+            self.pool.apply_async(
+                generate_chunk_mp,
+                args=(chunk_type, position, chunk_type.size,
+                      chunk_type.height, self.generator, self.seed,
+                      slabs.handle, slab),
+                callback=self.chunk_done
+            )
+
     def add_ready_chunk(self, position):
 
         self.ready_chunks.append(position)
 
-    def add_blocks(self, chunk_type, position, blocks):
+    def add_blocks(self, chunk_type, position, slab):
 
-        self.prepared_chunks[position] = chunk_type, blocks
+        self.prepared_chunks[position] = chunk_type, slab
 
     def create(self, chunk_type, chunk_position):
-        """
+        """Add new task, tasks are sent to workers in update.
 
         Args:
             chunk_position (int, int): X and Z coordinates
         """
 
-        width = chunk_type.size
-        height = chunk_type.height
-
         if self.task_exists(chunk_position):
 
             return
 
-        self.add_task(chunk_position)
+        retry_time = self.failed_positions.get(chunk_position)
+        if retry_time is not None:
 
-        self.pool.apply_async(
-            generate_chunk_mp,
-            args=(chunk_type, chunk_position, width, height),
-            callback=self.chunk_done
-        )
+            if time.time() < retry_time:
+
+                return
+
+            del self.failed_positions[chunk_position]
 
-    def build_ready_chunks(self):
+        self.add_task(chunk_type, chunk_position)
 
-        if len(self.ready_chunks) > 0:
+    def build_ready_chunks(self, deadline=None):
+        """Build ready chunks until the deadline.
+
+        At least one ready chunk is built.
+
+        Args:
+            deadline (float): time.time() value, build all without it
+        """
+
+        while len(self.ready_chunks) > 0:
 
             chunk_position = self.ready_chunks.popleft()
-            chunk_type = self.prepared_chunks[chunk_position][0]
-            blocks = self.prepared_chunks[chunk_position][1]
+            chunk_type, slab = self.prepared_chunks.pop(chunk_position)
 
-            self.build_chunk(chunk_type, chunk_position, blocks)
+            self.build_chunk(
+                chunk_type, chunk_position, self.take_blocks(chunk_type, slab))
 
             log.debug("ChunkCreator task {} done.".format(chunk_position))
 
+            if deadline is not None and time.time() >= deadline:
+
+                break
+
+    def take_blocks(self, chunk_type, slab):
+        """Copy blocks from the slab and release it.
+
+        Args:
+            chunk_type (Chunk): type of chunk
+            slab (int): slab index
+
+        Return:
+            numpy.ndarray: chunk blocks
+        """
+
+        slabs = self.get_slabs(chunk_type)
+        blocks = slabs.slab(
+            slab,
+            BLOCK_DTYPE,
+            (chunk_type.size, chunk_type.height, chunk_type.size)
+        ).copy()
+        slabs.release(slab)
+
+        return blocks
+
     def build_chunk(self, chunk_type, chunk_position, blocks):
 
         position_point = Point(chunk_position[0], 0, chunk_position[1])
 
         new_chunk = chunk_type(position_point, blocks=blocks)
 
-        self.active_tasks.remove(chunk_position)
+        self.active_tasks.discard(chunk_position)
         self.orig_dict[chunk_position] = new_chunk
 
     def chunk_done(self, data):
 
         chunk_type = data[0]
         chunk_position = data[1]
-        chunk_blocks = data[2]
+        slab = data[2]
+        error = data[3]
+
+        if error is not None:
 
-        self.add_blocks(chunk_type, chunk_position, chunk_blocks)
+            log.error("ChunkCreator task {} failed:\n{}".format(
+                chunk_position, error))
+
+            self.get_slabs(chunk_type).release(slab)
+            self.failed_chunks.append(chunk_position)
+
+            return
+
+        self.add_blocks(chunk_type, chunk_position, slab)
         self.add_ready_chunk(chunk_position)
 
         log.debug("chunk done")
 
-    def update(self):
+    def discard_failed_tasks(self):
+        """Forget failed tasks, the chunks can be created again later."""
+
+        while self.failed_chunks:
+
+            position = self.failed_chunks.popleft()
 
-        log.debug("Active ChunkCreator tasks: {}".format(
-            len(self.active_tasks)))
+            self.active_tasks.discard(position)
+            self.failed_positions[position] = (
+                time.time() + self.failed_task_delay)
 
-        self.build_ready_chunks()
+    def update(self, deadline=None):
+
+        self.discard_failed_tasks()
+        self.build_ready_chunks(deadline)
+        self.dispatch_tasks()
 
     def wait_for_procs(self):
 
         self.pool.close()
         self.pool.join()
 
+        if self.slabs is not None:
+
+            self.slabs.close()
+            self.slabs = None
+
+
+class ChunkCache(object):
+    """Cache for recently unloaded chunks.
+
+    The least recently added chunks are evicted when the cache is full.
+
+    Args:
+        capacity (int): maximum number of chunks
+    """
+
+    def __init__(self, capacity):
+
+        self.capacity = capacity
+        self.chunks = collections.OrderedDict()
+
+    def __len__(self):
+
+        return len(self.chunks)
+
+    def __contains__(self, position):
+
+        return position in self.chunks
+
+    def add(self, position, chunk):
+        """Add chunk to the cache.
+
+        Args:
+            position ((int, int)): chunk position/key (x, z)
+            chunk (Chunk): unloaded chunk
+
+        Return:
+            list: evicted (position, chunk) pairs
+        """
+
+        self.chunks.pop(position, None)
+        self.chunks[position] = chunk
+
+        evicted = []
+        while len(self.chunks) > self.capacity:
+
+            evicted.append(self.chunks.popitem(last=False))
+
+        return evicted
+
+    def pop(self, position):
+        """Remove chunk from the cache and return it.
+
+        Args:
+            position ((int, int)): chunk position/key (x, z)
+
+        Return:
+            Chunk or None: cached chunk
+        """
+
+        return self.chunks.pop(position, None)
+
 
 class Point(object):
     """Store data for point in 3D space.
@@ -226,6 +578,16 @@ class BlockInfo(object):
         self.chunk_id = chunk.chunk_id
         self.chunk_position = chunk.position
 
+    def __str__(self):
+        """Return string representation."""
+
+        return "BlockInfo: {} in chunk ({})".format(
+            self.position, self.chunk_position)
+
+    def __repr__(self):
+
+        return self.__str__()
+
 
 class Chunk(object):
     """Base class for chunks.
@@ -239,7 +601,7 @@ class Chunk(object):
         chunk_id (str): ID of chunk
         dirty (bool): indicates changes in chunk
         visible (bool): stores visibility for chunk
-        blocks (dict): dictionary of Block objects, key is (x, y, z) of int
+        blocks (numpy.ndarray): block types with shape (size, height, size)
     """
 
     size = None
@@ -259,7 +621,7 @@ class Chunk(object):
         self.dirty = False
         self.visible = False
 
-        if blocks:
+        if blocks is not None:
 
             self.blocks = blocks
 
@@ -276,56 +638,67 @@ class Chunk(object):
         """Generate chunk data.
 
         Return:
-            dict: {(x, y, z) of int: Block}
+            numpy.ndarray: block types with shape (size, height, size)
         """
 
         blocks = generate_chunk(self.size, self.height)
 
         return blocks
 
-    def block_collision(self, point):
-        """Return collision block info.
+    def block_index(self, point):
+        """Return position of block including the point.
+
+        Blocks are centred on integer positions, so only the nearest block
+        in every axis can be closer than 0.5. Neighbours are checked only
+        when the nearest block fails because of rounding.
 
         Args:
-            point (Point): the collision point
+            point (Point): the point
 
         Return:
-            BlockInfo or None: info about block
+            (x, y, z) of int or None: block position in chunk
         """
 
-        selected_blocks = []  # (x, y, z)
-        for x in range(int(point.x - 2 - self.position.x),
-                       int(point.x + 2 - self.position.x)):
-            for y in range(int(point.y - 2 - self.position.y),
-                           int(point.y + 2 - self.position.y)):
-                for z in range(int(point.z - 2 - self.position.z),
-                               int(point.z + 2 - self.position.z)):
+        axes = (
+            (point.x, self.position.x, self.size),
+            (point.y, self.position.y, self.height),
+            (point.z, self.position.z, self.size),
+        )
+
+        index = []
+        for value, origin, limit in axes:
 
-                    if x < 0 or x >= self.size:
+            nearest = int(floor(value - origin + 0.5))
 
-                        pass
+            for candidate in (nearest, nearest - 1, nearest + 1):
 
-                    elif y < 0 or y >= self.height:
+                if (0 <= candidate < limit
+                        and abs(candidate + origin - value) < 0.5):
 
-                        pass
+                    index.append(candidate)
+                    break
 
-                    elif z < 0 or z >= self.size:
+            else:
 
-                        pass
+                return None
 
-                    else:
+        return tuple(index)
 
-                        selected_blocks.append((x, y, z))
+    def block_collision(self, point):
+        """Return collision block info.
 
-        for block in selected_blocks:
+        Args:
+            point (Point): the collision point
 
-            if abs(block[0] + self.position.x - point.x) < 0.5:
-                if abs(block[1] + self.position.y - point.y) < 0.5:
-                    if abs(block[2] + self.position.z - point.z) < 0.5:
+        Return:
+            BlockInfo or None: info about block
+        """
 
-                        if self.blocks[block] is not None:
+        block = self.block_index(point)
 
-                            return BlockInfo(self, block)
+        if block is not None and self.blocks[block] != AIR:
+
+            return BlockInfo(self, block)
 
         return None
 
@@ -336,58 +709,9 @@ class Chunk(object):
             point (Point): check collision for this point
         """
 
-        # debug info
-        # counter = 0
-
-        # list of (x, y, z) of int
-        selected_blocks = []
-        for x in range(int(point.x - 2 - self.position.x),
-                       int(point.x + 2 - self.position.x)):
-            for y in range(int(point.y - 2 - self.position.y),
-                           int(point.y + 2 - self.position.y)):
-                for z in range(int(point.z - 2 - self.position.z),
-                               int(point.z + 2 - self.position.z)):
+        block = self.block_index(point)
 
-                    if x < 0 or x >= self.size:
-
-                        pass
-
-                    elif y < 0 or y >= self.height:
-
-                        pass
-
-                    elif z < 0 or z >= self.size:
-
-                        pass
-
-                    else:
-
-                        selected_blocks.append((x, y, z))
-
-        for block in selected_blocks:
-
-            if abs(block[0] + self.position.x - point.x) < 0.5:
-                if abs(block[1] + self.position.y - point.y) < 0.5:
-                    if abs(block[2] + self.position.z - point.z) < 0.5:
-
-                        if self.blocks[block] is not None:
-
-                            # print("Collision: {}".format(block))
-                            # print(counter)
-
-                            return True
-
-            # counter += 1
-
-        return False
-
-        # if self.block_collision(point) != None:
-        #
-        #     return True
-        #
-        # else:
-        #
-        #     return False
+        return block is not None and self.blocks[block] != AIR
 
     def __str__(self):
         """String representation of chunk."""
@@ -424,41 +748,111 @@ class NormalChunk(Chunk):
     def __str__(self):
         """String representation of chunk."""
 
-        return "NormalChunk: {} blocks".format(len(self.blocks))
+        return "NormalChunk: {} blocks".format(self.blocks.size)
 
 
 class BlockWorld(object):
-    """World encapsulates blocks in chunks."""
+    """World encapsulates blocks in chunks.
 
-    def __init__(self, chunk_type, width, depth):
+    Every chunk is given by the world seed and its position.
+
+    Args:
+        chunk_type (Chunk): type of chunks
+        width (int): width of initial world
+        depth (int): depth of initial world
+        seed (int): world seed, random seed is used for None
+        generator (str): chunk generator mode (random, flat, noise)
+        storage (region.RegionStore): storage for chunks or None
+        cache_size (int): number of unloaded chunks kept in memory
+    """
+
+    def __init__(self, chunk_type, width, depth, seed=None,
+                 generator="random", storage=None, cache_size=256):
 
         self.chunk_type = chunk_type
         self.chunk_size = self.chunk_type.size
         self.chunk_offset = 0.5
 
+        # preference of chunks in view direction, part of their distance
+        self.view_bias = 0.5
+
         self.width = width
         self.depth = depth
 
+        if seed is None:
+
+            seed = numpy.random.randint(0, 2 ** 31 - 1)
+
+        self.seed = seed
+        self.generator = generator
+        self.storage = storage
+
         self.chunks = {}
+        self.chunk_cache = ChunkCache(cache_size)
 
-        self.chunk_creator = ChunkCreator(self.chunks)
+        self.chunk_creator = ChunkCreator(
+            self.chunks, generator=self.generator, seed=self.seed)
 
         self.generate_world()
 
+    def chunk_key(self, x_pos, z_pos):
+        """Return key of chunk including the block position.
+
+        Blocks are centred on integer coordinates, so chunk at (x, z) covers
+        positions from x - 0.5 to x + size - 0.5.
+
+        Args:
+            x_pos (float): x position
+            z_pos (float): z position
+
+        Return:
+            ChunkKey: chunk key
+        """
+
+        size = self.chunk_size
+
+        return ChunkKey(
+            int(floor((x_pos + self.chunk_offset) / size)) * size,
+            int(floor((z_pos + self.chunk_offset) / size)) * size
+        )
+
+    def neighbour_blocks(self, position):
+        """Return blocks of horizontal neighbour chunks.
+
+        Args:
+            position ((int, int)): chunk position/key (x, z)
+
+        Return:
+            dict: direction (x, z): blocks or None for missing chunk
+        """
+
+        neighbours = {}
+        for direction in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+
+            chunk = self.chunks.get(ChunkKey(
+                position[0] + direction[0] * self.chunk_size,
+                position[1] + direction[1] * self.chunk_size
+            ))
+
+            neighbours[direction] = None if chunk is None else chunk.blocks
+
+        return neighbours
+
     def in_chunk(self, point):
         """Return chunk key according the point.
 
         Args:
             point (Point): find chunk including this point
+
+        Return:
+            ChunkKey or None: key of loaded chunk
         """
 
-        for position, chunk in self.chunks.items():
+        key = self.chunk_key(point.x, point.z)
 
-            x_dist = point.x - position[0] + self.chunk_offset
-            z_dist = point.z - position[1] + self.chunk_offset
-            if (0 < x_dist < chunk.size) and (0 < z_dist < chunk.size):
+        if key in self.chunks:
 
-                return position
+            return key
 
     def collision(self, point):
         """Return collision with a world as a boolean.
@@ -474,24 +868,192 @@ class BlockWorld(object):
         # TODO: change
         point.z = -point.z
 
-        offset = 0.5
+        chunk = self.chunks.get(self.chunk_key(point.x, point.z))
+
+        if chunk is None:
+
+            return False
+
+        return chunk.collision(point)
+
+    def blocks_at(self, x_indexes, y_indexes, z_indexes):
+        """Return block types on world block positions.
+
+        Positions in missing chunks or out of chunk height are empty.
+
+        Args:
+            x_indexes (numpy.ndarray): x positions of blocks as int
+            y_indexes (numpy.ndarray): y positions of blocks as int
+            z_indexes (numpy.ndarray): z positions of blocks as int
+
+        Return:
+            numpy.ndarray: block types
+        """
+
+        size = self.chunk_size
+        height = self.chunk_type.height
+
+        blocks = numpy.zeros(x_indexes.shape, dtype=BLOCK_DTYPE)
+
+        grid_x = x_indexes // size
+        grid_z = z_indexes // size
+
+        # one number for every chunk on the grid
+        grid_keys = grid_x.astype(numpy.int64) * 2 ** 32 + grid_z
+        grid_keys, first, inverse = numpy.unique(
+            grid_keys, return_index=True, return_inverse=True)
+        inverse = inverse.reshape(x_indexes.shape)
+
+        valid = (y_indexes >= 0) & (y_indexes < height)
+
+        for number, index in enumerate(first.flat):
+
+            key = ChunkKey(
+                int(grid_x.flat[index]) * size,
+                int(grid_z.flat[index]) * size
+            )
+
+            chunk = self.chunks.get(key)
+            if chunk is None:
+
+                continue
 
-        # counter = 0
-        for chunk in self.chunks:
+            mask = (inverse == number) & valid
+            blocks[mask] = chunk.blocks[
+                x_indexes[mask] - key.x,
+                y_indexes[mask],
+                z_indexes[mask] - key.z
+            ]
 
-            if (chunk[0] < point.x + offset and
-                    point.x - offset < chunk[0] + self.chunk_size):
-                if (chunk[1] < point.z + offset and
-                        point.z - offset < chunk[1] + self.chunk_size):
+        return blocks
+
+    def collide_many(self, points):
+        """Return collisions with the world for more points at once.
+
+        Points use the same coordinates as collision.
+
+        Args:
+            points (numpy.ndarray): points with shape (N, 3)
+
+        Return:
+            numpy.ndarray: collision for every point as bool
+        """
+
+        points = numpy.array(points, dtype=float).reshape(-1, 3)
+        points[:, 2] = -points[:, 2]
+
+        nearest = numpy.floor(points + 0.5)
+        # fix rounding of points close to block faces
+        nearest = numpy.where(
+            abs(nearest - points) < 0.5, nearest, nearest - 1)
+        inside = (abs(nearest - points) < 0.5).all(axis=1)
+
+        indexes = nearest.astype(int)
+        blocks = self.blocks_at(
+            indexes[:, 0], indexes[:, 1], indexes[:, 2])
 
-                    if self.chunks[chunk].collision(point):
+        return inside & (blocks != AIR)
 
-                        # print(counter)
-                        return True
+    def block_info(self, x_index, y_index, z_index):
+        """Return info about block on world block position.
 
-            # counter += 1
+        Args:
+            x_index (int): x position of block
+            y_index (int): y position of block
+            z_index (int): z position of block
+
+        Return:
+            BlockInfo or None: info about block in loaded chunk
+        """
+
+        key = self.chunk_key(x_index, z_index)
+        chunk = self.chunks.get(key)
+
+        if chunk is None:
 
-        return False
+            return None
+
+        return BlockInfo(chunk, (x_index - key.x, y_index, z_index - key.z))
+
+    def raycast(self, origin, direction, max_distance):
+        """Return the first solid block on the ray.
+
+        Args:
+            origin ((float, float, float)): ray origin in world coordinates
+            direction ((float, float, float)): ray direction
+            max_distance (float): max ray length
+
+        Return:
+            (BlockInfo, (int, int, int)) or None: block info and normal of
+                the hit face, zero normal for origin inside block
+        """
+
+        return self.raycast_many([origin], [direction], max_distance)[0]
+
+    def raycast_many(self, origins, directions, max_distance):
+        """Return the first solid blocks on more rays at once.
+
+        Amanatides-Woo grid traversal, every step moves all active rays to
+        the next block on their way.
+
+        Args:
+            origins (numpy.ndarray): ray origins with shape (N, 3)
+            directions (numpy.ndarray): ray directions with shape (N, 3)
+            max_distance (float): max ray length
+
+        Return:
+            list: (BlockInfo, normal) or None for every ray, rays with zero
+                direction hit nothing
+        """
+
+        # blocks are centred on integer positions, move them to [i, i + 1)
+        origins = numpy.array(origins, dtype=float).reshape(-1, 3) + 0.5
+        directions = numpy.array(directions, dtype=float).reshape(-1, 3)
+
+        lengths = numpy.sqrt((directions ** 2).sum(axis=1))
+        valid = lengths > 0
+        directions[valid] /= lengths[valid, None]
+
+        cells = numpy.floor(origins).astype(int)
+        steps = numpy.sign(directions).astype(int)
+
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+
+            deltas = abs(1.0 / directions)
+            boundaries = numpy.where(steps > 0, cells + 1, cells)
+            t_max = numpy.where(
+                steps != 0, (boundaries - origins) / directions, numpy.inf)
+
+        normals = numpy.zeros(cells.shape, dtype=int)
+        results = [None] * len(cells)
+
+        active = numpy.flatnonzero(valid)
+        while len(active):
+
+            blocks = self.blocks_at(
+                cells[active, 0], cells[active, 1], cells[active, 2])
+
+            for index in active[blocks != AIR]:
+
+                results[index] = (
+                    self.block_info(*cells[index].tolist()),
+                    tuple(normals[index].tolist())
+                )
+
+            active = active[blocks == AIR]
+
+            # move to the next block
+            axes = t_max[active].argmin(axis=1)
+            distances = t_max[active, axes]
+
+            cells[active, axes] += steps[active, axes]
+            t_max[active, axes] += deltas[active, axes]
+            normals[active] = 0
+            normals[active, axes] = - steps[active, axes]
+
+            active = active[distances <= max_distance]
+
+        return results
 
     def __str__(self):
         """String representation for world."""
@@ -509,6 +1071,17 @@ class BlockWorld(object):
 
             # print("Creating new chunk: {}".format(position))
 
+            chunk = self.chunk_cache.pop(position)
+            if chunk is not None:
+
+                self.chunks[position] = chunk
+
+                return
+
+            if self.load_chunk(position):
+
+                return
+
             # create chunk with creator
 
             if async:
@@ -517,12 +1090,112 @@ class BlockWorld(object):
 
             else:
 
+                blocks = generate_chunk(
+                    self.chunk_type.size,
+                    self.chunk_type.height,
+                    self.generator,
+                    self.seed,
+                    position
+                )
+
                 self.chunks[position] = self.chunk_type(
-                    Point(position[0], 0, position[1]))
+                    Point(position[0], 0, position[1]), blocks=blocks)
+
+    def load_chunk(self, position):
+        """Load chunk from the world storage.
+
+        Args:
+            position ((int, int)): position of chunk in a world
+
+        Return:
+            bool: True if the chunk was loaded
+        """
+
+        if self.storage is None:
+
+            return False
+
+        blocks = self.storage.load(position)
+        if blocks is None:
+
+            return False
 
-    def update_chunks(self):
+        self.chunks[position] = self.chunk_type(
+            Point(position[0], 0, position[1]), blocks=blocks)
 
-        self.chunk_creator.update()
+        return True
+
+    def save_chunk(self, position, chunk):
+        """Save new or changed chunk to the world storage.
+
+        Args:
+            position ((int, int)): position of chunk in a world
+            chunk (Chunk): the chunk
+        """
+
+        if self.storage is None:
+
+            return
+
+        if chunk.dirty or not self.storage.contains(position):
+
+            self.storage.save(position, chunk.blocks)
+            chunk.dirty = False
+
+    def save_chunks(self):
+        """Save new and changed chunks to the world storage."""
+
+        if self.storage is None:
+
+            return
+
+        for position, chunk in self.chunks.items():
+
+            self.save_chunk(position, chunk)
+
+        for position, chunk in self.chunk_cache.chunks.items():
+
+            self.save_chunk(position, chunk)
+
+        self.storage.flush()
+
+    def unload_chunks(self, point, distance):
+        """Unload chunks farther than the distance.
+
+        Unloaded chunks go to the chunk cache and chunks evicted from the
+        cache are saved to the world storage.
+
+        Args:
+            point (Point): observer position
+            distance (int): max distance
+
+        Return:
+            list: unloaded chunks
+        """
+
+        unloaded = []
+        for position, chunk in list(self.chunks.items()):
+
+            if point.chunk_distance(chunk.get_centre()) > distance:
+
+                del self.chunks[position]
+                unloaded.append(chunk)
+
+                evicted = self.chunk_cache.add(position, chunk)
+                for evicted_position, evicted_chunk in evicted:
+
+                    self.save_chunk(evicted_position, evicted_chunk)
+
+        if unloaded:
+
+            log.debug("Unloaded chunks: {}, cached: {}".format(
+                len(unloaded), len(self.chunk_cache)))
+
+        return unloaded
+
+    def update_chunks(self, deadline=None):
+
+        self.chunk_creator.update(deadline)
 
     def chunk_exists(self, position):
         """Return chunk existence on the position.
@@ -533,41 +1206,49 @@ class BlockWorld(object):
 
         return position in self.chunks
 
-    def find_necessary_chunks(self, point, distance):
+    def find_necessary_chunks(self, point, distance, direction=None):
         """Find necessary chunks in the distance.
 
+        Candidates come from cached grid offsets around the chunk under
+        the point, so the cost depends on the number of chunks only.
+
         Args:
             point (Point): centre point
             distance (int): distance
+            direction ((float, float)): view direction (x, z) for
+                preferring chunks in front of the point
 
         Return:
-            list: list of necessary chunks positions
+            list: list of necessary chunks positions sorted nearest-first
         """
 
-        offset = self.chunk_size / 2
-
-        min_x = int(point.x - distance) - offset
-        min_z = int(point.z - distance) - offset
-        max_x = int(point.x + distance) - offset
-        max_z = int(point.z + distance) - offset
+        size = self.chunk_size
+        offset = size / 2.0
 
-        positions = []
-        for x_pos in range(min_x, max_x):
-            for z_pos in range(min_z, max_z):
+        radius = int(ceil(float(distance) / size)) + 1
+        cells = chunk_offsets(radius) + (
+            int(floor(point.x / size)), int(floor(point.z / size)))
+        positions = cells * size
 
-                if (x_pos % self.chunk_size == 0 and
-                        z_pos % self.chunk_size == 0):
+        x_dist = positions[:, 0] + offset - point.x
+        z_dist = positions[:, 1] + offset - point.z
+        distances = numpy.sqrt(x_dist ** 2 + z_dist ** 2)
 
-                    if sqrt(pow((x_pos + offset) - point.x, 2)
-                            + pow((z_pos + offset) - point.z, 2)) > distance:
+        necessary = distances <= distance
+        positions = positions[necessary]
 
-                        pass
+        priorities = distances[necessary]
+        if direction is not None:
 
-                    else:
+            length = sqrt(direction[0] ** 2 + direction[1] ** 2) or 1.0
+            priorities = priorities - self.view_bias * (
+                x_dist[necessary] * direction[0] +
+                z_dist[necessary] * direction[1]) / length
 
-                        positions.append((x_pos, z_pos))
+        order = numpy.argsort(priorities, kind="mergesort")
 
-        return positions
+        return [ChunkKey(x_pos, z_pos)
+                for x_pos, z_pos in positions[order].tolist()]
 
     def find_nearest_chunks(self, point):
 
@@ -579,14 +1260,20 @@ class BlockWorld(object):
 
             print(self.chunks[chunk].block_collision(point))
 
-    def generate_chunks(self, point, distance):
+    def generate_chunks(self, point, distance, direction=None):
 
-        necessary_chunks = self.find_necessary_chunks(point, distance)
+        necessary_chunks = self.find_necessary_chunks(
+            point, distance, direction)
+
+        self.chunk_creator.set_centre(
+            point, distance, direction, self.view_bias)
 
         for position in necessary_chunks:
 
             self.generate_chunk(position)
 
+        self.chunk_creator.dispatch_tasks()
+
     def set_visibility(self, point, distance):
         """Set chunks visibility.
 
@@ -612,4 +1299,4 @@ class BlockWorld(object):
             for z in range(0, self.depth, self.chunk_size):
 
                 # self.chunks[(x, z)] = self.chunk_type(Point(x, 0, z))
-                self.generate_chunk((x, z), async=False)
+                self.generate_chunk(ChunkKey(x, z), async=False)
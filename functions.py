@@ -4,66 +4,307 @@
 
 from __future__ import print_function
 
-import random
+import traceback
+
+import numpy
 
 import data
+import shared
 
 # from decorators import print_time
 
 
-def generate_chunk_mp(chunk_type, position, width, height):
+# height of generated ground
+GROUND_LEVEL = 50
+
+# noise heightmap settings
+NOISE_BASE = 38
+NOISE_AMPLITUDE = 12
+NOISE_SCALE = 1.0 / 48
+NOISE_OCTAVES = 4
+
+# cached noise permutation tables
+permutations = {}
+
+
+def generate_chunk_mp(chunk_type, position, width, height, mode, seed,
+                      slab_handle, slab):
+    """Generate chunk data into shared slab.
+
+    Args:
+        chunk_type (Chunk): type of chunk
+        position ((int, int)): X and Z coordinates of chunk
+        width (int): width
+        height (int): height
+        mode (str): generator mode (random, flat, noise)
+        seed (int): world seed
+        slab_handle ((str, int)): slab pool handle
+        slab (int): slab index
+
+    Return:
+        tuple: chunk type, position, slab index and error traceback or None
+    """
+
+    # pool has no error callback, so errors are sent back as results
+    try:
+
+        blocks = shared.slab_array(
+            slab_handle, slab, data.BLOCK_DTYPE, (1, width, height, width))
+        blocks[...] = data.AIR
+
+        generate_chunks([position], width, height, mode, seed, blocks)
 
-    blocks = generate_chunk(width, height)
+    except Exception:
 
-    return chunk_type, position, blocks
+        return chunk_type, position, slab, traceback.format_exc()
+
+    return chunk_type, position, slab, None
 
 
 # @print_time
-def generate_chunk(width, height):
+def generate_chunk(width, height, mode="random", seed=None, position=(0, 0)):
     """Generate chunk data.
 
+    Chunk data are given by the seed and the position, only the random mode
+    without a seed uses global random numbers.
+
     Args:
         width (int): width
         height (int): height
+        mode (str): generator mode (random, flat, noise)
+        seed (int): world seed
+        position ((int, int)): X and Z coordinates of chunk
 
     Return:
-        dict: {(x, y, z) of int: Block}
+        numpy.ndarray: block types with shape (width, height, width)
     """
 
-    blocks = {}
+    return generate_chunks([position], width, height, mode, seed)[0]
 
-    last = False
-    for x in range(width):
-        for y in range(height):
-            for z in range(width):
 
-                if y < 50:
+def generate_chunks(positions, width, height, mode="random", seed=None,
+                    blocks=None):
+    """Generate data for more chunks at once.
 
-                    if last:
-                        if random.randint(0, 2) in (0, 1):
+    Args:
+        positions (list): X and Z coordinates of chunks
+        width (int): width
+        height (int): height
+        mode (str): generator mode (random, flat, noise)
+        seed (int): world seed
+        blocks (numpy.ndarray): empty blocks to fill, new array without it
 
-                            blocks[(x, y, z)] = data.Block()
-                            last = True
+    Return:
+        numpy.ndarray: block types with shape (count, width, height, width)
+    """
 
-                        else:
+    generators = {
+        "random": generate_random_blocks,
+        "flat": generate_flat_blocks,
+        "noise": generate_noise_blocks,
+    }
 
-                            blocks[(x, y, z)] = None
-                            last = False
+    if blocks is None:
 
-                    else:
+        blocks = numpy.zeros(
+            (len(positions), width, height, width), dtype=data.BLOCK_DTYPE)
 
-                        if random.randint(0, 3) in (0,):
+    ground = min(GROUND_LEVEL, height)
 
-                            blocks[(x, y, z)] = data.Block()
-                            last = True
+    generators[mode](blocks[:, :, :ground, :], positions, seed)
 
-                        else:
+    return blocks
 
-                            blocks[(x, y, z)] = None
-                            last = False
 
-                else:
+def chunk_random_state(seed, position):
+    """Return random numbers source for the chunk.
 
-                    blocks[(x, y, z)] = None
+    Args:
+        seed (int): world seed
+        position ((int, int)): X and Z coordinates of chunk
 
-    return blocks
+    Return:
+        numpy.random.RandomState: random numbers source
+    """
+
+    mask = 0xffffffff
+
+    return numpy.random.RandomState(
+        [seed & mask, position[0] & mask, position[1] & mask])
+
+
+def generate_random_blocks(blocks, positions, seed):
+    """Fill blocks with random solid blocks.
+
+    Blocks are generated in x, y, z order like a chain where the next block
+    is solid with probability 2/3 after a solid block and 1/4 after an empty
+    one. A random value under 1/4 means a solid block and a value from 2/3
+    means an empty one whatever the previous block was, values between
+    repeat the previous block. The chain can be computed at once by carrying
+    the last decisive value forward.
+
+    Args:
+        blocks (numpy.ndarray): blocks of chunks to fill
+        positions (list): X and Z coordinates of chunks
+        seed (int): world seed
+    """
+
+    count = blocks.shape[0]
+    length = blocks[0].size
+
+    if seed is None:
+
+        samples = numpy.random.random_sample((count, length + 1))
+
+    else:
+
+        samples = numpy.array([
+            chunk_random_state(seed, position).random_sample(length + 1)
+            for position in positions
+        ])
+
+    # the chain starts with an empty block
+    samples[:, 0] = 1.0
+
+    decisive = (samples < 0.25) | (samples >= 2.0 / 3.0)
+    indexes = numpy.where(decisive, numpy.arange(length + 1), 0)
+    numpy.maximum.accumulate(indexes, axis=1, out=indexes)
+
+    rows = numpy.arange(count)[:, numpy.newaxis]
+    solid = samples[rows, indexes[:, 1:]] < 0.25
+
+    blocks[solid.reshape(blocks.shape)] = data.SOLID
+
+
+def generate_flat_blocks(blocks, positions, seed):
+    """Fill all blocks with solid blocks.
+
+    Args:
+        blocks (numpy.ndarray): blocks of chunks to fill
+        positions (list): X and Z coordinates of chunks
+        seed (int): world seed
+    """
+
+    blocks[...] = data.SOLID
+
+
+def generate_noise_blocks(blocks, positions, seed):
+    """Fill blocks with terrain from noise heightmap.
+
+    Args:
+        blocks (numpy.ndarray): blocks of chunks to fill
+        positions (list): X and Z coordinates of chunks
+        seed (int): world seed
+    """
+
+    count, width, height = blocks.shape[:3]
+
+    offsets = numpy.arange(width)
+    x_coords = (numpy.array([position[0] for position in positions])
+                [:, numpy.newaxis, numpy.newaxis] + offsets[:, numpy.newaxis])
+    z_coords = (numpy.array([position[1] for position in positions])
+                [:, numpy.newaxis, numpy.newaxis] + offsets)
+
+    heights = noise_heightmap(x_coords, z_coords, seed or 0)
+    heights = numpy.clip(heights, 1, height)
+
+    levels = numpy.arange(height)[:, numpy.newaxis]
+    solid = levels < heights[:, :, numpy.newaxis, :]
+
+    blocks[solid] = data.SOLID
+
+
+def noise_heightmap(x_coords, z_coords, seed):
+    """Return terrain heights for coordinates.
+
+    Args:
+        x_coords (numpy.ndarray): X coordinates
+        z_coords (numpy.ndarray): Z coordinates
+        seed (int): world seed
+
+    Return:
+        numpy.ndarray: heights as int with the shape of coordinates
+    """
+
+    noise = numpy.zeros(numpy.broadcast(x_coords, z_coords).shape)
+
+    scale = NOISE_SCALE
+    amplitude = 1.0
+    for octave in range(NOISE_OCTAVES):
+
+        noise += amplitude * perlin_noise(
+            x_coords * scale, z_coords * scale, seed, octave)
+
+        scale *= 2
+        amplitude /= 2
+
+    return (NOISE_BASE + NOISE_AMPLITUDE * noise).astype(int)
+
+
+def noise_permutation(seed, octave):
+    """Return cached permutation table for the noise.
+
+    Args:
+        seed (int): world seed
+        octave (int): noise octave
+
+    Return:
+        numpy.ndarray: permutation of 256 values repeated twice
+    """
+
+    key = seed, octave
+    if key not in permutations:
+
+        random_state = numpy.random.RandomState(
+            [seed & 0xffffffff, octave])
+        permutation = random_state.permutation(256)
+
+        permutations[key] = numpy.concatenate((permutation, permutation))
+
+    return permutations[key]
+
+
+def perlin_noise(x_coords, z_coords, seed, octave=0):
+    """Return 2D gradient noise.
+
+    Args:
+        x_coords (numpy.ndarray): X coordinates
+        z_coords (numpy.ndarray): Z coordinates
+        seed (int): world seed
+        octave (int): noise octave
+
+    Return:
+        numpy.ndarray: noise values about from -1 to 1
+    """
+
+    permutation = noise_permutation(seed, octave)
+
+    x_floor = numpy.floor(x_coords)
+    z_floor = numpy.floor(z_coords)
+    x_cells = x_floor.astype(int) & 255
+    z_cells = z_floor.astype(int) & 255
+    x_rel = x_coords - x_floor
+    z_rel = z_coords - z_floor
+
+    def gradient(x_cell, z_cell, x_dist, z_dist):
+
+        angle = permutation[permutation[x_cell] + z_cell] * (numpy.pi / 128)
+
+        return numpy.cos(angle) * x_dist + numpy.sin(angle) * z_dist
+
+    def fade(value):
+
+        return value * value * value * (value * (value * 6 - 15) + 10)
+
+    n00 = gradient(x_cells, z_cells, x_rel, z_rel)
+    n10 = gradient(x_cells + 1, z_cells, x_rel - 1, z_rel)
+    n01 = gradient(x_cells, z_cells + 1, x_rel, z_rel - 1)
+    n11 = gradient(x_cells + 1, z_cells + 1, x_rel - 1, z_rel - 1)
+
+    x_fade = fade(x_rel)
+    z_fade = fade(z_rel)
+
+    n0 = n00 + x_fade * (n10 - n00)
+    n1 = n01 + x_fade * (n11 - n01)
+
+    return (n0 + z_fade * (n1 - n0)) * numpy.sqrt(2)
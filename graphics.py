@@ -11,9 +11,12 @@ from pyglet.window import key
 # PyOpenGL imports
 from OpenGL.GL import GL_ARRAY_BUFFER
 from OpenGL.GL import GL_COLOR_BUFFER_BIT
+from OpenGL.GL import GL_COPY_READ_BUFFER
+from OpenGL.GL import GL_COPY_WRITE_BUFFER
 from OpenGL.GL import GL_CULL_FACE
 from OpenGL.GL import GL_DEPTH_BUFFER_BIT
 from OpenGL.GL import GL_DEPTH_TEST
+from OpenGL.GL import GL_ELEMENT_ARRAY_BUFFER
 from OpenGL.GL import GL_FALSE
 from OpenGL.GL import GL_FLOAT
 from OpenGL.GL import GL_MODELVIEW
@@ -25,18 +28,25 @@ from OpenGL.GL import GLfloat
 from OpenGL.GL import GLuint
 
 from OpenGL.GL import glBindBuffer
+from OpenGL.GL import glBindVertexArray
 from OpenGL.GL import glBufferData
+from OpenGL.GL import glBufferSubData
 from OpenGL.GL import glClear
 from OpenGL.GL import glClearColor
+from OpenGL.GL import glCopyBufferSubData
+from OpenGL.GL import glDeleteBuffers
+from OpenGL.GL import glDeleteVertexArrays
 from OpenGL.GL import glDisable
 from OpenGL.GL import glDisableVertexAttribArray
 from OpenGL.GL import glDrawArrays
 from OpenGL.GL import glEnable
 from OpenGL.GL import glEnableVertexAttribArray
 from OpenGL.GL import glGenBuffers
+from OpenGL.GL import glGenVertexArrays
 from OpenGL.GL import glIsEnabled
 from OpenGL.GL import glLoadIdentity
 from OpenGL.GL import glMatrixMode
+from OpenGL.GL import glMultiDrawArrays
 from OpenGL.GL import glOrtho
 from OpenGL.GL import glRotatef
 from OpenGL.GL import glTranslatef
@@ -47,8 +57,10 @@ from OpenGL.GL import glViewport
 from OpenGL.GLU import gluPerspective
 
 # project imports
+import arena
 import camera
 import controls
+import meshing
 import player
 import script
 import shaders
@@ -168,6 +180,47 @@ class GraphicBlock(object):
         return vertexes
 
 
+def create_vao(name, values, gl_type, index_buffer=None):
+    """Return new VAO with vertex attribute from the buffer.
+
+    Args:
+        name (GLuint): vertex buffer
+        values (int): number of values in vertex
+        gl_type (int): GL type of values
+        index_buffer (GLuint): element buffer or None
+
+    Return:
+        GLuint: vertex array object
+    """
+
+    vao = GLuint()
+    glGenVertexArrays(1, vao)
+    glBindVertexArray(vao)
+
+    glBindBuffer(GL_ARRAY_BUFFER, name)
+    glEnableVertexAttribArray(shaders.VERTEX_ATTRIBUTE)
+    glVertexAttribPointer(
+        shaders.VERTEX_ATTRIBUTE, values, gl_type, GL_FALSE, 0, None)
+
+    if index_buffer is not None:
+
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, index_buffer)
+
+    glBindVertexArray(0)
+    glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    return vao
+
+
+def delete_vao(holder):
+    """Delete VAO of the buffer holder if it exists."""
+
+    if holder.vao is not None:
+
+        glDeleteVertexArrays(1, holder.vao)
+        holder.vao = None
+
+
 class VboData(object):
     """VBO data structure."""
 
@@ -179,9 +232,327 @@ class VboData(object):
         self.chunk_id = chunk_id
         self.vertexes_count = 0
 
+        # chunk position (x, z) for packed vertexes
+        self.origin = (0, 0)
+
+        # first vertex in the buffer
+        self.first = 0
+
+        # vertex array object, created with the first draw
+        self.vao = None
+
+        # first vertex of faces on chunk border
+        self.border_start = 0
+        # border faces built without neighbour chunk
+        self.missing = ()
+
         # render flag
         self.render = False
 
+    def delete(self):
+        """Free GL buffer."""
+
+        delete_vao(self)
+        glDeleteBuffers(1, self.name)
+
+
+class ArenaVbo(object):
+    """VBO data structure for range in buffer arena.
+
+    Count of vertexes and render flag are stored in arena arrays.
+
+    Args:
+        chunk_id (str): chunk ID
+        buffer_arena (BufferArena): arena with vertexes
+        slot (int): slot in the arena
+    """
+
+    def __init__(self, chunk_id, buffer_arena, slot):
+
+        self.chunk_id = chunk_id
+        self.arena = buffer_arena
+        self.slot = slot
+
+        self.origin = (0, 0)
+        self.border_start = 0
+        self.missing = ()
+
+    @property
+    def name(self):
+        """Return name of the arena buffer."""
+
+        return self.arena.name
+
+    @property
+    def first(self):
+
+        return int(self.arena.ranges.firsts[self.slot])
+
+    @property
+    def vertexes_count(self):
+
+        return int(self.arena.ranges.counts[self.slot])
+
+    @vertexes_count.setter
+    def vertexes_count(self, count):
+
+        self.arena.ranges.counts[self.slot] = count
+
+    @property
+    def render(self):
+
+        return bool(self.arena.ranges.visible[self.slot])
+
+    @render.setter
+    def render(self, value):
+
+        self.arena.ranges.visible[self.slot] = value
+
+    def delete(self):
+        """Free range in the arena."""
+
+        self.arena.ranges.free(self.slot)
+
+
+class BufferArena(object):
+    """Large GL buffer with sub-allocated chunk meshes.
+
+    Args:
+        capacity (int): buffer size in vertexes
+        stride (int): vertex size in bytes
+    """
+
+    def __init__(self, capacity, stride):
+
+        self.capacity = capacity
+        self.stride = stride
+
+        self.ranges = arena.Arena(capacity)
+
+        self.name = self.create_buffer(GL_ARRAY_BUFFER)
+
+        # vertex array object, created with the first draw
+        self.vao = None
+
+    def create_buffer(self, target):
+        """Return new empty GL buffer bound to the target."""
+
+        name = GLuint()
+        glGenBuffers(1, name)
+
+        glBindBuffer(target, name)
+        glBufferData(
+            target, self.capacity * self.stride, None, GL_STATIC_DRAW)
+
+        return name
+
+    def store(self, vertexes):
+        """Store vertexes in the arena.
+
+        Fragmented arena is compacted if the vertexes fit in free space.
+
+        Args:
+            vertexes (numpy.ndarray): vertexes
+
+        Return:
+            int or None: slot or None if vertexes don't fit
+        """
+
+        count = len(vertexes)
+
+        slot = self.ranges.allocate(count)
+        if slot is None and self.ranges.compactable_space >= count:
+
+            if self.compact():
+
+                slot = self.ranges.allocate(count)
+
+        if slot is None:
+
+            return None
+
+        glBindBuffer(GL_ARRAY_BUFFER, self.name)
+        glBufferSubData(
+            GL_ARRAY_BUFFER,
+            int(self.ranges.firsts[slot]) * self.stride,
+            vertexes.nbytes,
+            vertexes)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+        return slot
+
+    def compact(self):
+        """Copy used ranges to the start of a new buffer.
+
+        Copying between buffers needs OpenGL 3.1.
+
+        Return:
+            bool: True if the arena was compacted
+        """
+
+        if not pyglet.gl.gl_info.have_version(3, 1):
+
+            return False
+
+        old_name = self.name
+
+        glBindBuffer(GL_COPY_READ_BUFFER, old_name)
+        self.name = self.create_buffer(GL_COPY_WRITE_BUFFER)
+
+        for old_first, new_first, count in self.ranges.compact():
+
+            glCopyBufferSubData(
+                GL_COPY_READ_BUFFER,
+                GL_COPY_WRITE_BUFFER,
+                old_first * self.stride,
+                new_first * self.stride,
+                count * self.stride)
+
+        glBindBuffer(GL_COPY_READ_BUFFER, 0)
+        glBindBuffer(GL_COPY_WRITE_BUFFER, 0)
+        glDeleteBuffers(1, old_name)
+
+        # VAO refers to the old buffer
+        delete_vao(self)
+
+        log.debug("Arena compacted: {} free vertexes".format(
+            self.ranges.free_space))
+
+        return True
+
+    def draw(self):
+        """Draw visible ranges of the bound arena with one call."""
+
+        firsts, counts = self.ranges.ranges()
+
+        if len(firsts):
+
+            glMultiDrawArrays(GL_TRIANGLES, firsts, counts, len(firsts))
+
+    def delete(self):
+        """Free GL buffer."""
+
+        delete_vao(self)
+        glDeleteBuffers(1, self.name)
+
+
+class BufferArenas(object):
+    """Buffer arenas for VBOs with one vertex size.
+
+    New arena is created when vertexes don't fit in existing ones.
+
+    Args:
+        stride (int): vertex size in bytes
+        capacity (int): arena size in vertexes
+    """
+
+    def __init__(self, stride, capacity=1 << 20):
+
+        self.stride = stride
+        self.capacity = capacity
+
+        self.arenas = []
+
+    def store(self, chunk_id, vertexes):
+        """Store vertexes in an arena.
+
+        Args:
+            chunk_id (str): chunk ID
+            vertexes (numpy.ndarray): vertexes
+
+        Return:
+            ArenaVbo: VBO data object
+        """
+
+        for buffer_arena in self.arenas:
+
+            slot = buffer_arena.store(vertexes)
+            if slot is not None:
+
+                return ArenaVbo(chunk_id, buffer_arena, slot)
+
+        buffer_arena = BufferArena(
+            max(self.capacity, len(vertexes)), self.stride)
+        self.arenas.append(buffer_arena)
+
+        log.debug("New buffer arena: {}".format(len(self.arenas)))
+
+        return ArenaVbo(chunk_id, buffer_arena, buffer_arena.store(vertexes))
+
+    def release_empty(self):
+        """Delete arenas without VBOs."""
+
+        empty = [
+            buffer_arena for buffer_arena in self.arenas
+            if buffer_arena.ranges.empty
+        ]
+
+        for buffer_arena in empty:
+
+            buffer_arena.delete()
+            self.arenas.remove(buffer_arena)
+
+        if empty:
+
+            log.debug("Released buffer arenas: {}".format(len(empty)))
+
+    def delete(self):
+
+        for buffer_arena in self.arenas:
+
+            buffer_arena.delete()
+
+        self.arenas = []
+
+
+class QuadIndexBuffer(object):
+    """Element buffer with triangle indexes for quads shared by all VBOs.
+
+    Args:
+        count (int): initial number of quads
+    """
+
+    def __init__(self, count=0):
+
+        self.name = GLuint()
+        glGenBuffers(1, self.name)
+
+        self.count = 0
+        self.reserve(count)
+        self.bind()
+
+    def bind(self):
+
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.name)
+
+    def reserve(self, count):
+        """Grow the buffer to at least the number of quads.
+
+        The buffer is bound as element array buffer after growing.
+        """
+
+        if count <= self.count:
+
+            return
+
+        self.bind()
+
+        self.count = max(count, self.count * 2)
+        indexes = meshing.quad_indexes(self.count)
+
+        glBufferData(
+            GL_ELEMENT_ARRAY_BUFFER,
+            indexes.nbytes,
+            indexes,
+            GL_STATIC_DRAW)
+
+        log.debug("Quad indexes: {}".format(self.count))
+
+    def delete(self):
+        """Free GL buffer."""
+
+        glDeleteBuffers(1, self.name)
+
 
 class GameWindow(pyglet.window.Window):
     """Show game window."""
@@ -204,9 +575,11 @@ class GameWindow(pyglet.window.Window):
             print("Unsupported OpenGL version.")
             sys.exit()
 
+        self.renderer.set_capabilities(self.capabilities)
+
         # schedule tasks
         pyglet.clock.schedule_interval(self.print_info, 5.0 / 1.0)
-        pyglet.clock.schedule_interval(self.data_update, 1.0)
+        pyglet.clock.schedule(self.data_update)
         pyglet.clock.schedule_interval(self.less_frequent_tasks, 1.0 / 2.0)
         pyglet.clock.schedule_interval(self.update, 1.0 / 30.0)
 
@@ -249,12 +622,13 @@ class GameWindow(pyglet.window.Window):
         # init shaders
         shader_pool = shaders.ShaderPool(self.capabilities)
         self.shader_programs = shader_pool.get_shaders()
+        self.shader_program = 0
 
         # initial rendering - fill, lines, points
         self.rendering_type = "fill"
 
         # variables for scheduling
-        self.long_tasks = 3
+        self.long_tasks = 4
         self.long_tasks_counter = 0
 
         self.setup()
@@ -324,6 +698,13 @@ class GameWindow(pyglet.window.Window):
 
         self.print_gl_settings()
 
+    def on_close(self):
+        """Delete GL buffers while the context exists."""
+
+        self.renderer.delete_buffers()
+
+        super(GameWindow, self).on_close()
+
     def on_resize(self, width, height):
         """Prepare perspective for window size."""
 
@@ -381,11 +762,13 @@ class GameWindow(pyglet.window.Window):
 
         if shader_name in self.shader_programs:
 
-            glUseProgram(self.shader_programs[shader_name])
+            self.shader_program = self.shader_programs[shader_name]
 
         else:
 
-            glUseProgram(0)
+            self.shader_program = 0
+
+        glUseProgram(self.shader_program)
 
     def on_draw(self):
         """Redraw window."""
@@ -403,15 +786,11 @@ class GameWindow(pyglet.window.Window):
             -self.camera.y_pos,
             self.camera.z_pos)
 
-        if self.rendering_type == "fill":
-
-            self.use_shader("test")
-
-        elif self.rendering_type == "lines":
+        if self.rendering_type in ("fill", "lines"):
 
-            self.use_shader("lines")
+            self.use_shader(self.renderer.shader_name(self.rendering_type))
 
-        self.renderer.render()
+        self.renderer.render(self.shader_program)
 
         # draw HUD
         self.set_2d()
@@ -471,12 +850,20 @@ class GameWindow(pyglet.window.Window):
 
         elif self.long_tasks_counter % self.long_tasks == 1:
 
+            x_step, z_step = self.camera.horizontal_step(0.0, 1.0)
+
             self.renderer.prepare_new_chunks(
-                self.camera.get_position_inverse_z())
+                self.camera.get_position_inverse_z(), (x_step, - z_step))
 
         elif self.long_tasks_counter % self.long_tasks == 2:
 
             self.renderer.create_vbos()
+            self.renderer.remesh_borders()
+
+        elif self.long_tasks_counter % self.long_tasks == 3:
+
+            self.renderer.unload_chunks(
+                self.camera.get_position_inverse_z())
 
         self.long_tasks_counter += 1
 
@@ -491,6 +878,11 @@ class GameWindow(pyglet.window.Window):
             # nchunks = self.renderer.world.find_nearest_chunks(cposition)
             # print(self.renderer.world.block_collision(cposition, nchunks))
 
+            # print(self.renderer.pick_block(
+            #     self.camera.get_position_inverse_z(),
+            #     self.camera.view_vec(),
+            #     10.0))
+
             pass
 
         if self.scripter:
@@ -515,12 +907,12 @@ class GameWindow(pyglet.window.Window):
         # move up
         if self.keyboard[key._8]:
 
-            self.camera.up()
+            self.player.up()
 
         # move down
         elif self.keyboard[key._9]:
 
-            self.camera.down()
+            self.player.down()
 
         # lines rendering
         if self.keyboard[key._2]:
@@ -551,7 +943,7 @@ class GameWindow(pyglet.window.Window):
 
         if self.keyboard[key.NUM_1]:
 
-            self.camera.sprint()
+            self.player.sprint()
 
         elif self.keyboard[key.NUM_2]:
 
@@ -0,0 +1,580 @@
+# -*- coding: utf-8 -*-
+
+"""Module for chunk meshes.
+
+Meshes are float32 arrays with shape (N, 3) of triangle vertexes in world
+coordinates. Blocks are centred on integer coordinates.
+
+Chunk meshes keep faces on horizontal chunk borders at the end, so they
+can be rebuilt alone when a neighbour chunk appears.
+
+Meshes can be converted to the packed format with uint8 vertexes (x, y, z,
+face) where x, y and z are block corners relative to the chunk position,
+and to quads with 4 vertexes per face for indexed drawing.
+"""
+
+import numpy
+
+import data
+
+
+# face normals in order front, top, right, left, back, bottom
+NORMALS = numpy.array([
+    (0, 0, 1),
+    (0, 1, 0),
+    (1, 0, 0),
+    (-1, 0, 0),
+    (0, 0, -1),
+    (0, -1, 0),
+])
+
+# face corners for every face, counter-clockwise from outside
+QUADS = numpy.array([
+    # front
+    [(-1, -1, 1), (1, -1, 1), (1, 1, 1), (-1, 1, 1)],
+    # top
+    [(-1, 1, 1), (1, 1, 1), (1, 1, -1), (-1, 1, -1)],
+    # right
+    [(1, -1, 1), (1, -1, -1), (1, 1, -1), (1, 1, 1)],
+    # left
+    [(-1, -1, 1), (-1, 1, 1), (-1, 1, -1), (-1, -1, -1)],
+    # back
+    [(-1, -1, -1), (-1, 1, -1), (1, 1, -1), (1, -1, -1)],
+    # bottom
+    [(-1, -1, 1), (-1, -1, -1), (1, -1, -1), (1, -1, 1)],
+]) * 0.5
+
+# two triangles from quad corners
+QUAD_TRIANGLES = [0, 1, 2, 0, 2, 3]
+
+# triangle vertexes with quad corners
+QUAD_CORNERS = [0, 1, 2, 5]
+
+# triangle vertexes for every face with shape (6, 6, 3)
+FACE_TRIANGLES = QUADS[:, QUAD_TRIANGLES]
+
+# triangle vertexes of whole cube with shape (36, 3)
+CUBE_TRIANGLES = FACE_TRIANGLES.reshape(-1, 3)
+
+# vertex formats, data type and values per vertex
+VERTEX_FORMATS = {
+    "float": (numpy.float32, 3),
+    "packed": (numpy.uint8, 4),
+}
+
+# horizontal faces with directions (x, z) to neighbour chunks
+BORDER_FACES = {
+    0: (0, 1),
+    2: (1, 0),
+    3: (-1, 0),
+    4: (0, -1),
+}
+
+
+def opposite_face(face):
+    """Return face with the opposite normal."""
+
+    return int(numpy.nonzero((NORMALS == -NORMALS[face]).all(axis=1))[0][0])
+
+
+def outer_layer(face, inner=slice(None)):
+    """Return index of the outer chunk layer in the horizontal face direction.
+
+    Args:
+        face (int): horizontal face
+        inner (slice): slice for other axes
+
+    Return:
+        tuple: index for chunk blocks
+    """
+
+    x_dir, _, z_dir = NORMALS[face]
+
+    index = [inner, inner, inner]
+    if x_dir:
+
+        index[0] = -1 if x_dir > 0 else 0
+
+    else:
+
+        index[2] = -1 if z_dir > 0 else 0
+
+    return tuple(index)
+
+
+def border_layers(neighbours):
+    """Return solid masks of neighbour layers next to the chunk.
+
+    Args:
+        neighbours (dict): direction (x, z): neighbour blocks or None
+
+    Return:
+        dict: horizontal face: layer mask or None for missing neighbour
+    """
+
+    layers = {}
+    for face, direction in BORDER_FACES.items():
+
+        blocks = neighbours.get(direction)
+        if blocks is None:
+
+            layers[face] = None
+
+        else:
+
+            layers[face] = blocks[outer_layer(opposite_face(face))] != data.AIR
+
+    return layers
+
+
+def cube_vertexes(indexes, position):
+    """Return triangle vertexes of whole cubes.
+
+    Args:
+        indexes (numpy.ndarray): block indexes in chunk (N, 3)
+        position ((int, int)): X and Z coordinates of chunk
+
+    Return:
+        numpy.ndarray: vertexes with shape (N * 36, 3)
+    """
+
+    origin = numpy.array([position[0], 0, position[1]], dtype=numpy.float32)
+    centres = indexes.astype(numpy.float32) + origin
+
+    vertexes = centres[:, numpy.newaxis, :] + CUBE_TRIANGLES
+
+    return vertexes.reshape(-1, 3).astype(numpy.float32)
+
+
+def cube_mesh(blocks, position):
+    """Return mesh with whole cubes for all solid blocks.
+
+    Args:
+        blocks (numpy.ndarray): chunk blocks
+        position ((int, int)): X and Z coordinates of chunk
+
+    Return:
+        numpy.ndarray: vertexes with shape (N, 3)
+    """
+
+    indexes = numpy.transpose(numpy.nonzero(blocks != data.AIR))
+
+    return cube_vertexes(indexes, position)
+
+
+def exposed_masks(blocks):
+    """Return masks of solid blocks with the face adjacent to air.
+
+    Space out of the chunk is taken as air.
+
+    Args:
+        blocks (numpy.ndarray): chunk blocks
+
+    Return:
+        list: mask with the shape of blocks for every face
+    """
+
+    solid = blocks != data.AIR
+    padded = numpy.pad(solid, 1, mode="constant")
+
+    width, height, depth = solid.shape
+
+    masks = []
+    for x_dir, y_dir, z_dir in NORMALS:
+
+        neighbours = padded[
+            1 + x_dir:1 + x_dir + width,
+            1 + y_dir:1 + y_dir + height,
+            1 + z_dir:1 + z_dir + depth
+        ]
+
+        masks.append(solid & ~neighbours)
+
+    return masks
+
+
+def interior_masks(blocks):
+    """Return masks of exposed faces without faces on chunk border.
+
+    Args:
+        blocks (numpy.ndarray): chunk blocks
+
+    Return:
+        list: mask with the shape of blocks for every face
+    """
+
+    masks = exposed_masks(blocks)
+    for face in BORDER_FACES:
+
+        masks[face][outer_layer(face)] = False
+
+    return masks
+
+
+def border_masks(blocks, borders):
+    """Return masks of exposed faces on chunk border.
+
+    Args:
+        blocks (numpy.ndarray): chunk blocks
+        borders (dict): horizontal face: neighbour layer mask or None
+
+    Return:
+        list: mask with the shape of blocks for every face
+    """
+
+    solid = blocks != data.AIR
+    masks = [numpy.zeros_like(solid) for _ in NORMALS]
+
+    for face in BORDER_FACES:
+
+        index = outer_layer(face)
+        layer = borders.get(face)
+
+        if layer is None:
+
+            masks[face][index] = solid[index]
+
+        else:
+
+            masks[face][index] = solid[index] & ~layer
+
+    return masks
+
+
+def exposed_faces(blocks):
+    """Return faces of solid blocks adjacent to air.
+
+    Args:
+        blocks (numpy.ndarray): chunk blocks
+
+    Return:
+        (numpy.ndarray, numpy.ndarray): block indexes (N, 3), faces (N,)
+    """
+
+    return mask_faces(exposed_masks(blocks))
+
+
+def mask_faces(masks):
+    """Return faces from face masks.
+
+    Args:
+        masks (list): mask for every face
+
+    Return:
+        (numpy.ndarray, numpy.ndarray): block indexes (N, 3), faces (N,)
+    """
+
+    indexes = []
+    faces = []
+    for face, mask in enumerate(masks):
+
+        face_indexes = numpy.transpose(numpy.nonzero(mask))
+
+        indexes.append(face_indexes)
+        faces.append(numpy.repeat(face, len(face_indexes)))
+
+    return numpy.concatenate(indexes), numpy.concatenate(faces)
+
+
+def face_vertexes(indexes, faces, position):
+    """Return triangle vertexes for block faces.
+
+    Args:
+        indexes (numpy.ndarray): block indexes in chunk (N, 3)
+        faces (numpy.ndarray): face numbers (N,)
+        position ((int, int)): X and Z coordinates of chunk
+
+    Return:
+        numpy.ndarray: vertexes with shape (N * 6, 3)
+    """
+
+    return box_vertexes(indexes, indexes, faces, position)
+
+
+def box_vertexes(lows, highs, faces, position):
+    """Return triangle vertexes for faces of block boxes.
+
+    Every face covers the side of the box from the lowest to the highest
+    block index.
+
+    Args:
+        lows (numpy.ndarray): lowest block indexes in chunk (N, 3)
+        highs (numpy.ndarray): highest block indexes in chunk (N, 3)
+        faces (numpy.ndarray): face numbers (N,)
+        position ((int, int)): X and Z coordinates of chunk
+
+    Return:
+        numpy.ndarray: vertexes with shape (N * 6, 3)
+    """
+
+    origin = numpy.array([position[0], 0, position[1]], dtype=numpy.float32)
+    lows = lows.astype(numpy.float32) + origin
+    highs = highs.astype(numpy.float32) + origin
+
+    templates = FACE_TRIANGLES[faces]
+    vertexes = numpy.where(
+        templates < 0,
+        lows[:, numpy.newaxis, :] + templates,
+        highs[:, numpy.newaxis, :] + templates
+    )
+
+    return vertexes.reshape(-1, 3).astype(numpy.float32)
+
+
+def face_mesh(blocks, position):
+    """Return mesh with block faces adjacent to air.
+
+    Args:
+        blocks (numpy.ndarray): chunk blocks
+        position ((int, int)): X and Z coordinates of chunk
+
+    Return:
+        numpy.ndarray: vertexes with shape (N, 3)
+    """
+
+    return faces_vertexes(blocks, exposed_masks(blocks), position)
+
+
+def faces_vertexes(blocks, masks, position):
+    """Return triangle vertexes for every face in masks."""
+
+    indexes, faces = mask_faces(masks)
+
+    return face_vertexes(indexes, faces, position)
+
+
+def greedy_rectangles(layer):
+    """Return maximal rectangles of equal non-zero values.
+
+    Rectangles are grown along the second axis first and then along
+    the first one.
+
+    Args:
+        layer (numpy.ndarray): 2D array of block types, 0 for no face
+
+    Return:
+        list: rectangles (first_low, second_low, first_high, second_high)
+    """
+
+    layer = layer.copy()
+    rows, columns = layer.shape
+
+    rectangles = []
+    for row, column in zip(*numpy.nonzero(layer)):
+
+        value = layer[row, column]
+        if value == 0:
+
+            # already merged
+            continue
+
+        column_end = column + 1
+        while column_end < columns and layer[row, column_end] == value:
+
+            column_end += 1
+
+        row_end = row + 1
+        while (row_end < rows and
+               (layer[row_end, column:column_end] == value).all()):
+
+            row_end += 1
+
+        layer[row:row_end, column:column_end] = 0
+        rectangles.append((row, column, row_end - 1, column_end - 1))
+
+    return rectangles
+
+
+def greedy_mesh(blocks, position):
+    """Return mesh with coplanar faces merged into rectangles.
+
+    Faces of the same block type are merged in every layer of blocks.
+
+    Args:
+        blocks (numpy.ndarray): chunk blocks
+        position ((int, int)): X and Z coordinates of chunk
+
+    Return:
+        numpy.ndarray: vertexes with shape (N, 3)
+    """
+
+    return greedy_vertexes(blocks, exposed_masks(blocks), position)
+
+
+def greedy_vertexes(blocks, masks, position):
+    """Return triangle vertexes for faces in masks merged into rectangles."""
+
+    boxes = []
+    faces = []
+    for face, mask in enumerate(masks):
+
+        axis = int(numpy.nonzero(NORMALS[face])[0][0])
+        first, second = [index for index in range(3) if index != axis]
+
+        # layers along the face normal
+        layers = numpy.rollaxis(numpy.where(mask, blocks, data.AIR), axis)
+
+        for layer in numpy.nonzero(layers.any(axis=2).any(axis=1))[0]:
+            for rectangle in greedy_rectangles(layers[layer]):
+
+                box = numpy.empty((2, 3), dtype=int)
+                box[:, axis] = layer
+                box[:, first] = rectangle[0], rectangle[2]
+                box[:, second] = rectangle[1], rectangle[3]
+
+                boxes.append(box)
+                faces.append(face)
+
+    if not boxes:
+
+        return numpy.zeros((0, 3), dtype=numpy.float32)
+
+    boxes = numpy.array(boxes)
+
+    return box_vertexes(
+        boxes[:, 0], boxes[:, 1], numpy.array(faces), position)
+
+
+def chunk_mesh(blocks, position, mode="faces", borders=None):
+    """Return chunk mesh with border faces at the end.
+
+    Faces next to missing neighbour chunks are kept. Cubes have no
+    border faces.
+
+    Args:
+        blocks (numpy.ndarray): chunk blocks
+        position ((int, int)): X and Z coordinates of chunk
+        mode (str): mesh mode (cubes, faces, greedy)
+        borders (dict): horizontal face: neighbour layer mask or None
+
+    Return:
+        (numpy.ndarray, int): vertexes, index of the first border vertex
+    """
+
+    if mode == "cubes":
+
+        vertexes = cube_mesh(blocks, position)
+
+        return vertexes, len(vertexes)
+
+    builders = {
+        "faces": faces_vertexes,
+        "greedy": greedy_vertexes,
+    }
+
+    interior = builders[mode](blocks, interior_masks(blocks), position)
+    border = builders[mode](
+        blocks, border_masks(blocks, borders or {}), position)
+
+    return numpy.concatenate((interior, border)), len(interior)
+
+
+def border_mesh(blocks, position, mode="faces", borders=None):
+    """Return only border faces of chunk mesh.
+
+    Args:
+        blocks (numpy.ndarray): chunk blocks
+        position ((int, int)): X and Z coordinates of chunk
+        mode (str): mesh mode (faces, greedy)
+        borders (dict): horizontal face: neighbour layer mask or None
+
+    Return:
+        numpy.ndarray: vertexes with shape (N, 3)
+    """
+
+    builders = {
+        "faces": faces_vertexes,
+        "greedy": greedy_vertexes,
+    }
+
+    return builders[mode](
+        blocks, border_masks(blocks, borders or {}), position)
+
+
+def pack_vertexes(vertexes, position):
+    """Return vertexes in the packed format.
+
+    Every 6 vertexes make one face, the face number is found from the
+    normal of the first triangle.
+
+    Args:
+        vertexes (numpy.ndarray): float vertexes with shape (N, 3)
+        position ((int, int)): X and Z coordinates of chunk
+
+    Return:
+        numpy.ndarray: uint8 vertexes with shape (N, 4)
+    """
+
+    origin = numpy.array([position[0], 0, position[1]])
+    corners = numpy.round(vertexes - origin + 0.5).astype(int)
+
+    if len(corners) and (corners.min() < 0 or corners.max() > 255):
+
+        raise ValueError("Chunk is too big for packed vertexes")
+
+    triangles = vertexes.reshape(-1, 6, 3)
+    normals = numpy.cross(
+        triangles[:, 1] - triangles[:, 0],
+        triangles[:, 2] - triangles[:, 0]
+    )
+    faces = numpy.argmax(numpy.dot(normals, NORMALS.T), axis=1)
+
+    packed = numpy.empty((len(vertexes), 4), dtype=numpy.uint8)
+    packed[:, :3] = corners
+    packed[:, 3] = numpy.repeat(faces, 6)
+
+    return packed
+
+
+def quad_vertexes(vertexes):
+    """Return 4 corners of every face instead of 6 triangle vertexes.
+
+    Args:
+        vertexes (numpy.ndarray): vertexes with shape (N * 6, values)
+
+    Return:
+        numpy.ndarray: vertexes with shape (N * 4, values)
+    """
+
+    values = vertexes.shape[1]
+
+    return vertexes.reshape(-1, 6, values)[:, QUAD_CORNERS].reshape(-1, values)
+
+
+def quad_indexes(count):
+    """Return triangle indexes for quads.
+
+    Args:
+        count (int): number of quads
+
+    Return:
+        numpy.ndarray: uint32 indexes with shape (count * 6,)
+    """
+
+    starts = numpy.arange(count, dtype=numpy.uint32)[:, numpy.newaxis] * 4
+
+    return (starts + numpy.array(QUAD_TRIANGLES, numpy.uint32)).ravel()
+
+
+def convert_vertexes(vertexes, position, vertex_format="float", quads=False):
+    """Return vertexes in the vertex format.
+
+    Args:
+        vertexes (numpy.ndarray): float vertexes with shape (N, 3)
+        position ((int, int)): X and Z coordinates of chunk
+        vertex_format (str): vertex format (float, packed)
+        quads (bool): 4 vertexes per face for indexed drawing
+
+    Return:
+        numpy.ndarray: vertexes
+    """
+
+    if vertex_format == "packed":
+
+        vertexes = pack_vertexes(vertexes, position)
+
+    if quads:
+
+        vertexes = quad_vertexes(vertexes)
+
+    return vertexes
@@ -2,7 +2,11 @@
 
 from __future__ import print_function
 
-import copy
+from math import ceil
+from math import floor
+from math import pi
+
+import numpy
 
 import data
 import script
@@ -25,25 +29,28 @@ class Body(script.Controllable):
         # static for now
         self.vertical_offsets = [0.2, 1.2]
 
+        # distance kept from blocks
+        self.skin = 0.001
+
     def fall(self):
 
-        position = data.Point(
-            self.camera.x_pos,
-            self.camera.y_pos - self.camera_height,
-            self.camera.z_pos)
-        position2 = data.Point(
-            self.camera.x_pos,
-            self.camera.y_pos - (self.height * 0.8),
-            self.camera.z_pos)
+        collisions = self.renderer.ground_collisions([
+            (self.camera.x_pos,
+             self.camera.y_pos - (self.height * 0.8),
+             self.camera.z_pos),
+            (self.camera.x_pos,
+             self.camera.y_pos - self.camera_height,
+             self.camera.z_pos),
+        ])
 
-        if self.renderer.ground_collision(position2):
+        if collisions[0]:
 
             # print("helper")
             self.camera.collision_helper()
             self.camera.stop_falling()
             self.camera_fall_collision = True
 
-        elif self.renderer.ground_collision(position):
+        elif collisions[1]:
 
             self.camera.stop_falling()
             self.camera_fall_collision = True
@@ -60,6 +67,28 @@ class Body(script.Controllable):
 
             self.camera.jump_counter = 0
 
+    def collisions(self, points):
+        """Check collisions for points and all their vertical offsets.
+
+        Args:
+            points (list): data.Point objects
+
+        Return:
+            numpy.ndarray: collision for every point as bool
+        """
+
+        offsets = numpy.array(self.vertical_offsets) - self.camera_height
+
+        coordinates = numpy.array(
+            [(point.x, point.y, point.z) for point in points], dtype=float)
+
+        probes = numpy.repeat(coordinates, len(offsets), axis=0)
+        probes[:, 1] += numpy.tile(offsets, len(points))
+
+        collisions = self.renderer.ground_collisions(probes)
+
+        return collisions.reshape(len(points), len(offsets)).any(axis=1)
+
     def is_collide(self, point):
         """Check collision for point and all its vertical offsets.
 
@@ -70,68 +99,162 @@ class Body(script.Controllable):
             bool: collision
         """
 
-        for offset in self.vertical_offsets:
+        return self.collisions([point])[0]
 
-            temp = copy.copy(point)
-            temp.y += offset - self.camera_height
+    def box(self):
+        """Return bounding box of body in world coordinates.
 
-            if self.renderer.ground_collision(temp):
+        Box height is given by vertical offsets like for point collisions
+        and world z axis is inverse to camera z axis.
 
-                return True
+        Return:
+            (numpy.ndarray, numpy.ndarray): minimal and maximal corner
+        """
 
-        return False
+        feet = self.camera.y_pos - self.camera_height
+        centre = numpy.array(
+            [self.camera.x_pos, feet, -self.camera.z_pos], dtype=float)
 
-    def forward(self):
+        box_min = centre - self.collision_offset
+        box_max = centre + self.collision_offset
+        box_min[1] = feet + min(self.vertical_offsets)
+        box_max[1] = feet + max(self.vertical_offsets)
 
-        next_x = self.camera.next_fw_x_point(self.collision_offset)
-        next_z = self.camera.next_fw_z_point(self.collision_offset)
+        return box_min, box_max
 
-        if not self.is_collide(next_x):
+    def sweep(self, x_step, y_step, z_step):
+        """Return movement shortened by collisions with blocks.
 
-            self.camera.forward_x()
+        Body box is moved along every axis separately and only blocks in the
+        swept space are checked, so fast movement can't skip blocks.
 
-        if not self.is_collide(next_z):
+        Args:
+            x_step (float): x step
+            y_step (float): y step
+            z_step (float): z step
 
-            self.camera.forward_z()
+        Return:
+            (float, float, float): possible x, y and z step
+        """
 
-    def backward(self):
+        box_min, box_max = self.box()
 
-        next_x = self.camera.next_bw_x_point(self.collision_offset)
-        next_z = self.camera.next_bw_z_point(self.collision_offset)
+        # camera z axis is inverse to world z axis
+        steps = [x_step, y_step, -z_step]
+        for axis in range(3):
 
-        if not self.is_collide(next_x):
+            steps[axis] = self.sweep_axis(box_min, box_max, axis, steps[axis])
 
-            self.camera.backward_x()
+            box_min[axis] += steps[axis]
+            box_max[axis] += steps[axis]
 
-        if not self.is_collide(next_z):
+        return steps[0], steps[1], -steps[2]
 
-            self.camera.backward_z()
+    def sweep_axis(self, box_min, box_max, axis, step):
+        """Return step along the axis shortened by collisions.
 
-    def left(self):
+        Blocks are centred on integer positions. Blocks overlapping the box
+        already are ignored, so body can leave them.
+
+        Args:
+            box_min (numpy.ndarray): minimal box corner
+            box_max (numpy.ndarray): maximal box corner
+            axis (int): axis index
+            step (float): step along the axis
+
+        Return:
+            float: possible step
+        """
 
-        next_x = self.camera.next_left_x_point(self.collision_offset)
-        next_z = self.camera.next_left_z_point(self.collision_offset)
+        if step == 0:
 
-        if not self.is_collide(next_x):
+            return step
 
-            self.camera.left_x()
+        # block ranges overlapping the box
+        ranges = [
+            numpy.arange(
+                int(floor(box_min[index] - 0.5)) + 1,
+                int(ceil(box_max[index] + 0.5)))
+            for index in range(3)
+        ]
 
-        if not self.is_collide(next_z):
+        # blocks in swept space in order of movement
+        if step > 0:
+
+            ranges[axis] = numpy.arange(
+                int(ceil(box_max[axis] + 0.5)),
+                int(ceil(box_max[axis] + step + 0.5)))
+
+        else:
+
+            ranges[axis] = numpy.arange(
+                int(floor(box_min[axis] - 0.5)),
+                int(floor(box_min[axis] + step - 0.5)),
+                -1)
+
+        if not all(len(indexes) for indexes in ranges):
+
+            return step
+
+        grid = numpy.meshgrid(*ranges, indexing="ij")
+        blocks = self.renderer.blocks_at(*grid)
+
+        solid = numpy.rollaxis(blocks != data.AIR, axis)
+        solid = solid.reshape(len(ranges[axis]), -1)
+        hits = numpy.flatnonzero(solid.any(axis=1))
+
+        if len(hits) == 0:
+
+            return step
+
+        block = ranges[axis][hits[0]]
+        if step > 0:
+
+            return max(0.0, block - 0.5 - box_max[axis] - self.skin)
+
+        else:
+
+            return min(0.0, block + 0.5 - box_min[axis] + self.skin)
+
+    def move(self, angle, step):
+        """Move body horizontally.
+
+        Args:
+            angle (float): angle from view direction in radians
+            step (float): step length
+        """
+
+        x_step, z_step = self.camera.horizontal_step(angle, step)
+
+        self.camera.translate(*self.sweep(x_step, 0.0, z_step))
+
+    def forward(self):
+
+        self.move(0.0, self.camera.step)
+
+    def sprint(self):
+
+        self.move(0.0, self.camera.step * self.camera.sprint_mp)
+
+    def backward(self):
+
+        self.move(pi, self.camera.step)
+
+    def left(self):
 
-            self.camera.left_z()
+        self.move(- pi / 2, self.camera.side_step)
 
     def right(self):
 
-        next_x = self.camera.next_right_x_point(self.collision_offset)
-        next_z = self.camera.next_right_z_point(self.collision_offset)
+        self.move(pi / 2, self.camera.side_step)
 
-        if not self.is_collide(next_x):
+    def up(self):
 
-            self.camera.right_x()
+        self.camera.translate(*self.sweep(0.0, self.camera.fly_step, 0.0))
 
-        if not self.is_collide(next_z):
+    def down(self):
 
-            self.camera.right_z()
+        self.camera.translate(*self.sweep(0.0, -self.camera.fly_step, 0.0))
 
     def jump(self):
 
@@ -0,0 +1,442 @@
+# -*- coding: utf-8 -*-
+
+"""Module for world persistence.
+
+Chunks are stored in region files. Every region file groups square of
+chunks and starts with a fixed-size header and an index of chunk slots.
+Chunk data follow in fixed-size slots in order of saving. The world seed
+and generator are stored in a world file next to region files.
+"""
+
+import mmap
+import os
+import struct
+import logging
+
+import numpy
+
+import data
+
+
+log = logging.getLogger(__name__)
+
+# region side in chunks
+REGION_SIZE = 32
+
+MAGIC = b"PGLR"
+VERSION = 1
+
+# magic, version, chunk size, chunk height, region size
+HEADER = struct.Struct("<4sHHHH")
+INDEX_DTYPE = numpy.dtype("<u4")
+
+WORLD_FILE = "world.dat"
+WORLD_MAGIC = b"PGLW"
+# magic, version, seed, generator
+WORLD_HEADER = struct.Struct("<4sHq16s")
+
+
+class RegionError(Exception):
+
+    pass
+
+
+class RegionFile(object):
+    """Region file with chunks data.
+
+    Args:
+        filename (str): region file name
+        chunk_size (int): size of chunk side
+        chunk_height (int): height of chunk
+        region_size (int): region side in chunks
+
+    Attributes:
+        index (numpy.ndarray): slot number + 1 for every chunk, 0 for none
+    """
+
+    def __init__(self, filename, chunk_size, chunk_height,
+                 region_size=REGION_SIZE):
+
+        self.filename = filename
+
+        self.chunk_size = chunk_size
+        self.chunk_height = chunk_height
+        self.region_size = region_size
+
+        self.chunk_shape = (chunk_size, chunk_height, chunk_size)
+        self.chunk_bytes = (
+            chunk_size * chunk_height * chunk_size *
+            numpy.dtype(data.BLOCK_DTYPE).itemsize)
+
+        self.index_offset = HEADER.size
+        self.data_offset = (
+            self.index_offset + region_size ** 2 * INDEX_DTYPE.itemsize)
+
+        self.mapping = None
+
+        if os.path.isfile(filename):
+
+            self.fh = open(filename, "r+b")
+            self.index = self.read_index()
+
+        else:
+
+            self.fh = open(filename, "w+b")
+            self.index = numpy.zeros(region_size ** 2, dtype=INDEX_DTYPE)
+            self.write_header()
+
+        self.slots = int(self.index.max())
+
+    def write_header(self):
+        """Write header and empty index to the file."""
+
+        self.fh.seek(0)
+        self.fh.write(HEADER.pack(
+            MAGIC,
+            VERSION,
+            self.chunk_size,
+            self.chunk_height,
+            self.region_size
+        ))
+        self.fh.write(self.index.tostring())
+        self.fh.flush()
+
+    def read_index(self):
+        """Check header and return index from the file.
+
+        Return:
+            numpy.ndarray: chunk index
+        """
+
+        mapping = self.get_mapping()
+
+        if len(mapping) < self.data_offset:
+
+            raise RegionError("Truncated region file: {}".format(
+                self.filename))
+
+        header = HEADER.unpack_from(mapping, 0)
+        expected = (
+            MAGIC,
+            VERSION,
+            self.chunk_size,
+            self.chunk_height,
+            self.region_size
+        )
+
+        if header != expected:
+
+            raise RegionError("Incompatible region file: {}".format(
+                self.filename))
+
+        index = numpy.frombuffer(
+            mapping,
+            INDEX_DTYPE,
+            self.region_size ** 2,
+            self.index_offset
+        )
+
+        return index.copy()
+
+    def get_mapping(self):
+        """Return memory mapping of the file."""
+
+        if self.mapping is None:
+
+            self.fh.flush()
+            self.mapping = mmap.mmap(
+                self.fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+        return self.mapping
+
+    def release_mapping(self):
+        """Release memory mapping after file changes."""
+
+        if self.mapping is not None:
+
+            self.mapping.close()
+            self.mapping = None
+
+    def slot_index(self, position):
+        """Return index entry for the chunk.
+
+        Args:
+            position ((int, int)): chunk position in region
+
+        Return:
+            int: index entry
+        """
+
+        return position[1] * self.region_size + position[0]
+
+    def has_chunk(self, position):
+        """Return chunk existence in the region.
+
+        Args:
+            position ((int, int)): chunk position in region
+        """
+
+        return self.index[self.slot_index(position)] != 0
+
+    def load_chunk(self, position):
+        """Return chunk blocks or None if chunk is not saved.
+
+        Args:
+            position ((int, int)): chunk position in region
+
+        Return:
+            numpy.ndarray or None: chunk blocks
+        """
+
+        slot = int(self.index[self.slot_index(position)])
+        if slot == 0:
+
+            return None
+
+        offset = self.data_offset + (slot - 1) * self.chunk_bytes
+        blocks = numpy.frombuffer(
+            self.get_mapping(),
+            data.BLOCK_DTYPE,
+            self.chunk_bytes // numpy.dtype(data.BLOCK_DTYPE).itemsize,
+            offset
+        )
+
+        return blocks.reshape(self.chunk_shape).copy()
+
+    def save_chunk(self, position, blocks):
+        """Save chunk blocks.
+
+        Args:
+            position ((int, int)): chunk position in region
+            blocks (numpy.ndarray): chunk blocks
+        """
+
+        if blocks.shape != self.chunk_shape:
+
+            raise RegionError("Bad chunk shape: {}".format(blocks.shape))
+
+        self.release_mapping()
+
+        entry = self.slot_index(position)
+        slot = int(self.index[entry])
+        new_slot = slot == 0
+
+        if new_slot:
+
+            self.slots += 1
+            slot = self.slots
+
+        # data reach the disk before the index entry, so an interrupted
+        # save doesn't leave the entry pointing to a missing chunk
+        self.fh.seek(self.data_offset + (slot - 1) * self.chunk_bytes)
+        self.fh.write(
+            numpy.ascontiguousarray(blocks, data.BLOCK_DTYPE).tostring())
+
+        if new_slot:
+
+            self.fh.flush()
+            os.fsync(self.fh.fileno())
+
+            self.index[entry] = slot
+            self.fh.seek(self.index_offset + entry * INDEX_DTYPE.itemsize)
+            self.fh.write(self.index[entry:entry + 1].tostring())
+
+    def flush(self):
+
+        self.fh.flush()
+
+    def close(self):
+
+        self.release_mapping()
+        self.fh.close()
+
+
+class RegionStore(object):
+    """Store chunks in region files.
+
+    Args:
+        directory (str): directory for region files
+        chunk_type (Chunk): type of chunks
+        region_size (int): region side in chunks
+    """
+
+    def __init__(self, directory, chunk_type, region_size=REGION_SIZE):
+
+        self.directory = directory
+        self.chunk_size = chunk_type.size
+        self.chunk_height = chunk_type.height
+        self.region_size = region_size
+
+        # opened region files
+        self.regions = {}
+
+        if not os.path.isdir(directory):
+
+            os.makedirs(directory)
+
+    def world_seed(self, seed, generator):
+        """Return seed of the stored world.
+
+        New world is saved with the seed, random seed is used for None.
+        Stored world can't be continued with other seed or generator.
+
+        Args:
+            seed (int): world seed or None
+            generator (str): chunk generator mode
+
+        Return:
+            int: world seed
+        """
+
+        filename = os.path.join(self.directory, WORLD_FILE)
+
+        if not os.path.isfile(filename):
+
+            if seed is None:
+
+                seed = numpy.random.randint(0, 2 ** 31 - 1)
+
+            with open(filename, "wb") as fh:
+
+                fh.write(WORLD_HEADER.pack(
+                    WORLD_MAGIC, VERSION, seed, generator.encode("ascii")))
+
+            return seed
+
+        with open(filename, "rb") as fh:
+
+            values = fh.read(WORLD_HEADER.size)
+
+        if len(values) != WORLD_HEADER.size:
+
+            raise RegionError("Truncated world file: {}".format(filename))
+
+        magic, version, stored_seed, stored_generator = WORLD_HEADER.unpack(
+            values)
+        stored_generator = stored_generator.rstrip(b"\0").decode("ascii")
+
+        if (magic, version) != (WORLD_MAGIC, VERSION):
+
+            raise RegionError("Incompatible world file: {}".format(filename))
+
+        if seed is not None and seed != stored_seed:
+
+            raise RegionError("World {} has seed {}, not {}".format(
+                self.directory, stored_seed, seed))
+
+        if generator != stored_generator:
+
+            raise RegionError("World {} has generator {}, not {}".format(
+                self.directory, stored_generator, generator))
+
+        return stored_seed
+
+    def region_position(self, position):
+        """Return region key and chunk position in region.
+
+        Args:
+            position ((int, int)): chunk position/key (x, z)
+
+        Return:
+            ((int, int), (int, int)): region key, position in region
+        """
+
+        grid_x = position[0] // self.chunk_size
+        grid_z = position[1] // self.chunk_size
+
+        region_key = (grid_x // self.region_size, grid_z // self.region_size)
+        local = (grid_x % self.region_size, grid_z % self.region_size)
+
+        return region_key, local
+
+    def region_filename(self, region_key):
+
+        return os.path.join(
+            self.directory,
+            "r.{}.{}.region".format(region_key[0], region_key[1]))
+
+    def get_region(self, region_key, create=False):
+        """Return opened region file.
+
+        Args:
+            region_key ((int, int)): region key
+            create (bool): create missing region file
+
+        Return:
+            RegionFile or None: region file
+        """
+
+        if region_key not in self.regions:
+
+            filename = self.region_filename(region_key)
+            if not create and not os.path.isfile(filename):
+
+                return None
+
+            log.debug("Opening region file: {}".format(filename))
+
+            self.regions[region_key] = RegionFile(
+                filename,
+                self.chunk_size,
+                self.chunk_height,
+                self.region_size
+            )
+
+        return self.regions[region_key]
+
+    def contains(self, position):
+        """Return chunk existence in store.
+
+        Args:
+            position ((int, int)): chunk position/key (x, z)
+        """
+
+        region_key, local = self.region_position(position)
+        region = self.get_region(region_key)
+
+        return region is not None and region.has_chunk(local)
+
+    def load(self, position):
+        """Return saved chunk blocks.
+
+        Args:
+            position ((int, int)): chunk position/key (x, z)
+
+        Return:
+            numpy.ndarray or None: chunk blocks
+        """
+
+        region_key, local = self.region_position(position)
+        region = self.get_region(region_key)
+
+        if region is None:
+
+            return None
+
+        return region.load_chunk(local)
+
+    def save(self, position, blocks):
+        """Save chunk blocks.
+
+        Args:
+            position ((int, int)): chunk position/key (x, z)
+            blocks (numpy.ndarray): chunk blocks
+        """
+
+        region_key, local = self.region_position(position)
+
+        self.get_region(region_key, create=True).save_chunk(local, blocks)
+
+    def flush(self):
+
+        for region in self.regions.values():
+
+            region.flush()
+
+    def close(self):
+
+        for region in self.regions.values():
+
+            region.close()
+
+        self.regions = {}
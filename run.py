@@ -6,6 +6,7 @@ import core
 import graphics
 import data
 import configuration
+import region
 
 
 log = logging.getLogger(__name__)
@@ -20,14 +21,53 @@ def main():
 
     log.info("Program start.")
 
-    cw = data.BlockWorld(data.NormalChunk, 20, 20)
     conf = configuration.EngineConfiguration("settings.ini", "user.ini")
+    values = conf.get_values()
+
+    seed = values["seed"]
+    if seed is not None:
+
+        seed = int(seed)
+
+    storage = None
+    if values["world_directory"]:
+
+        storage = region.RegionStore(
+            values["world_directory"], data.NormalChunk)
+
+        try:
+
+            seed = storage.world_seed(seed, values["generator"])
+
+        except region.RegionError as err:
+
+            log.error(err)
+
+            return
+
+    cw = data.BlockWorld(
+        data.NormalChunk,
+        20,
+        20,
+        seed=seed,
+        generator=values["generator"],
+        storage=storage
+    )
     renderer = core.Renderer(cw, conf)
     renderer.prepare_world()
 
     window = graphics.GameWindow(renderer)
     window.show()
 
+    # workers are stopped before shared memory is released
+    renderer.vbo_creator.wait_for_procs()
+    cw.chunk_creator.wait_for_procs()
+
+    cw.save_chunks()
+    if storage is not None:
+
+        storage.close()
+
     log.info("Program exit.")
 
 
@@ -7,10 +7,19 @@
 # PyOpenGL imports
 from OpenGL.GL import GL_VERTEX_SHADER
 from OpenGL.GL import GL_FRAGMENT_SHADER
+from OpenGL.GL import GL_LINK_STATUS
+from OpenGL.GL import glBindAttribLocation
+from OpenGL.GL import glGetProgramInfoLog
+from OpenGL.GL import glGetProgramiv
+from OpenGL.GL import glLinkProgram
 from OpenGL.GL.shaders import compileShader
 from OpenGL.GL.shaders import compileProgram
 
 
+# location of vertex attribute, the same as gl_Vertex
+VERTEX_ATTRIBUTE = 0
+
+
 def read_shader(filename):
     """Read shader program from file and return it as a string."""
 
@@ -48,6 +57,21 @@ def compile_program(*shaders):
     return compileProgram(*shaders)
 
 
+def bind_attribute(program, location, name):
+    """Bind vertex attribute to the location and link program again.
+
+    Fixed location lets VAOs work with all programs.
+    """
+
+    glBindAttribLocation(program, location, name)
+    glLinkProgram(program)
+
+    if not glGetProgramiv(program, GL_LINK_STATUS):
+
+        raise RuntimeError(
+            "Link failure: {}".format(glGetProgramInfoLog(program)))
+
+
 class ShaderPool(object):
     """Shader programs manager."""
 
@@ -81,6 +105,8 @@ class ShaderPool(object):
         self.pool["test"] = self.init_test_shader()
         self.pool["hud"] = self.init_hud_shader()
         self.pool["lines"] = self.init_line_shader()
+        self.pool["packed"] = self.init_packed_shader()
+        self.pool["packed_lines"] = self.init_packed_line_shader()
 
     def init_test_shader(self):
         """Return compiled test shader."""
@@ -111,3 +137,25 @@ class ShaderPool(object):
         program = compile_program(v_shader, f_shader)
 
         return program
+
+    def init_packed_shader(self):
+        """Return compiled shader for packed vertexes."""
+
+        v_shader = load_vshader('shaders_data/packed.vs')
+        f_shader = load_fshader('shaders_data/test1.fs')
+
+        program = compile_program(v_shader, f_shader)
+        bind_attribute(program, VERTEX_ATTRIBUTE, "vertex")
+
+        return program
+
+    def init_packed_line_shader(self):
+        """Return compiled line shader for packed vertexes."""
+
+        v_shader = load_vshader('shaders_data/packed.vs')
+        f_shader = load_fshader('shaders_data/black.fs')
+
+        program = compile_program(v_shader, f_shader)
+        bind_attribute(program, VERTEX_ATTRIBUTE, "vertex")
+
+        return program
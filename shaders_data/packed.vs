@@ -0,0 +1,19 @@
+#version 120
+
+// block corner in chunk (x, y, z) and face number
+attribute vec4 vertex;
+
+uniform vec3 chunk_origin;
+
+varying vec4 vColor;
+
+void main()
+{
+    vec3 position = chunk_origin + vertex.xyz - 0.5;
+
+    float color = mod(floor(position.y), 2.0);
+    float shade = 1.0 - 0.1 * vertex.w;
+    vColor = vec4(color * shade, 0.0, 0.0, 1.0);
+
+    gl_Position = gl_ModelViewProjectionMatrix * vec4(position, 1.0);
+}
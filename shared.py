@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+
+"""Module for memory shared between processes.
+
+Shared buffers are memory mapped files in shared memory directory, so
+worker processes can attach them by file name and data don't need
+pickling.
+"""
+
+import collections
+import logging
+import mmap
+import os
+import tempfile
+
+import numpy
+
+
+log = logging.getLogger(__name__)
+
+# shared memory directory, temporary directory is used without it
+SHM_DIRECTORY = "/dev/shm"
+
+# buffers attached in worker process, file name: SharedBuffer
+attached_buffers = {}
+
+
+class SharedBuffer(object):
+    """Memory mapped file shared between processes.
+
+    Args:
+        filename (str): file name, new file is created for None
+        size (int): buffer size in bytes for new file
+    """
+
+    def __init__(self, filename=None, size=0):
+
+        if filename is None:
+
+            directory = None
+            if os.path.isdir(SHM_DIRECTORY):
+
+                directory = SHM_DIRECTORY
+
+            fd, filename = tempfile.mkstemp(
+                prefix="pygl-", suffix=".shm", dir=directory)
+            os.ftruncate(fd, max(size, 1))
+
+        else:
+
+            fd = os.open(filename, os.O_RDWR)
+
+        self.filename = filename
+        self.fd = fd
+        self.size = 0
+        self.mapping = None
+
+        self.remap()
+
+    def remap(self):
+        """Map the file again with its current size."""
+
+        if self.mapping is not None:
+
+            self.mapping.close()
+
+        self.size = os.fstat(self.fd).st_size
+        self.mapping = mmap.mmap(self.fd, self.size)
+
+    def refresh(self):
+        """Map the file again if other process resized it."""
+
+        if os.fstat(self.fd).st_size != self.size:
+
+            self.remap()
+
+    def resize(self, size):
+        """Resize the buffer to the size in bytes."""
+
+        os.ftruncate(self.fd, size)
+        self.remap()
+
+    def reserve(self, size):
+        """Grow the buffer to at least the size in bytes.
+
+        The buffer size is doubled to avoid frequent resizing.
+        """
+
+        self.refresh()
+
+        if self.size < size:
+
+            self.resize(max(size, self.size * 2))
+
+    def array(self, dtype, shape, offset=0):
+        """Return numpy array using the buffer memory.
+
+        Args:
+            dtype (numpy.dtype): array data type
+            shape (tuple): array shape
+            offset (int): offset in bytes
+
+        Return:
+            numpy.ndarray: array view
+        """
+
+        count = int(numpy.prod(shape))
+
+        return numpy.frombuffer(
+            self.mapping, dtype, count, offset).reshape(shape)
+
+    def close(self):
+
+        self.mapping.close()
+        os.close(self.fd)
+
+    def remove(self):
+        """Close the buffer and remove its file."""
+
+        self.close()
+
+        if os.path.exists(self.filename):
+
+            os.remove(self.filename)
+
+
+def attach(filename):
+    """Return shared buffer attached in this process.
+
+    Args:
+        filename (str): buffer file name
+
+    Return:
+        SharedBuffer: shared buffer
+    """
+
+    if filename not in attached_buffers:
+
+        attached_buffers[filename] = SharedBuffer(filename)
+
+    shared_buffer = attached_buffers[filename]
+    shared_buffer.refresh()
+
+    return shared_buffer
+
+
+class SlabPool(object):
+    """Pool of fixed-size slabs in one shared buffer.
+
+    Slabs are checked out by the parent process and a worker gets the
+    handle and the slab index instead of data.
+
+    Args:
+        count (int): number of slabs
+        slab_size (int): slab size in bytes
+    """
+
+    def __init__(self, count, slab_size):
+
+        self.count = count
+        self.slab_size = slab_size
+
+        self.buffer = SharedBuffer(size=count * slab_size)
+
+        # deque is safe for releasing from pool callbacks
+        self.free_slabs = collections.deque(range(count))
+
+    @property
+    def handle(self):
+        """Return handle for workers."""
+
+        return self.buffer.filename, self.slab_size
+
+    def checkout(self):
+        """Return index of free slab or None if all are used."""
+
+        try:
+
+            return self.free_slabs.popleft()
+
+        except IndexError:
+
+            return None
+
+    def release(self, index):
+        """Return slab to the pool."""
+
+        self.free_slabs.append(index)
+
+    def slab(self, index, dtype, shape):
+        """Return numpy array using the slab memory."""
+
+        return self.buffer.array(dtype, shape, index * self.slab_size)
+
+    def close(self):
+
+        self.buffer.remove()
+
+
+def slab_array(handle, index, dtype, shape):
+    """Return numpy array using the slab memory in worker process.
+
+    Args:
+        handle ((str, int)): slab pool handle
+        index (int): slab index
+        dtype (numpy.dtype): array data type
+        shape (tuple): array shape
+
+    Return:
+        numpy.ndarray: array view
+    """
+
+    filename, slab_size = handle
+
+    return attach(filename).array(dtype, shape, index * slab_size)
+
+
+class BufferPool(object):
+    """Pool of growable shared buffers.
+
+    Buffers are created on demand and a worker can grow a buffer for
+    its data. A worker gets a buffer handle (the file name) instead of
+    data and the parent gets only the data size back.
+
+    Args:
+        buffer_size (int): initial size of new buffers in bytes
+    """
+
+    def __init__(self, buffer_size=65536):
+
+        self.buffer_size = buffer_size
+
+        self.buffers = []
+        # deque is safe for releasing from pool callbacks
+        self.free_buffers = collections.deque()
+
+    def checkout(self):
+        """Return index of free buffer, new buffer is created if necessary."""
+
+        try:
+
+            return self.free_buffers.popleft()
+
+        except IndexError:
+
+            self.buffers.append(SharedBuffer(size=self.buffer_size))
+            log.debug("New shared buffer: {}".format(len(self.buffers)))
+
+            return len(self.buffers) - 1
+
+    def release(self, index):
+        """Return buffer to the pool."""
+
+        self.free_buffers.append(index)
+
+    def handle(self, index):
+        """Return handle of the buffer for workers."""
+
+        return self.buffers[index].filename
+
+    def array(self, index, dtype, count):
+        """Return numpy array using the buffer memory.
+
+        Args:
+            index (int): buffer index
+            dtype (numpy.dtype): array data type
+            count (int): number of items
+
+        Return:
+            numpy.ndarray: array view
+        """
+
+        shared_buffer = self.buffers[index]
+        shared_buffer.refresh()
+
+        return shared_buffer.array(dtype, (count,))
+
+    def close(self):
+
+        for shared_buffer in self.buffers:
+
+            shared_buffer.remove()
+
+        self.buffers = []
+        self.free_buffers.clear()
+
+
+def write_array(handle, values, dtype):
+    """Write values into the shared buffer in worker process.
+
+    The buffer is grown if necessary.
+
+    Args:
+        handle (str): buffer handle
+        values (sequence): values to write
+        dtype (numpy.dtype): data type in the buffer
+
+    Return:
+        int: number of written items
+    """
+
+    values = numpy.asarray(values, dtype)
+
+    shared_buffer = attach(handle)
+    shared_buffer.reserve(values.nbytes)
+    shared_buffer.array(dtype, values.shape)[...] = values
+
+    return values.size
@@ -0,0 +1,97 @@
+# -*- encoding: utf-8 -*-
+
+from __future__ import unicode_literals
+from __future__ import print_function
+
+import unittest
+
+import arena
+
+
+class TestArena(unittest.TestCase):
+
+    def setUp(self):
+
+        self.arena = arena.Arena(100, slots=2)
+
+    def test_allocate(self):
+
+        first = self.arena.allocate(40)
+        second = self.arena.allocate(40)
+        third = self.arena.allocate(10)
+
+        self.assertEqual(list(self.arena.firsts[[first, second, third]]),
+                         [0, 40, 80])
+        self.assertIsNone(self.arena.allocate(20))
+        self.assertEqual(self.arena.free_space, 10)
+
+    def test_free_merge(self):
+
+        slots = [self.arena.allocate(20) for _ in range(5)]
+
+        self.arena.free(slots[1])
+        self.arena.free(slots[3])
+        self.assertEqual(self.arena.free_ranges, [(20, 20), (60, 20)])
+
+        self.arena.free(slots[2])
+        self.assertEqual(self.arena.free_ranges, [(20, 60)])
+
+        self.assertEqual(self.arena.firsts[self.arena.allocate(60)], 20)
+
+    def test_compact(self):
+
+        slots = [self.arena.allocate(25) for _ in range(4)]
+        self.arena.free(slots[0])
+        self.arena.free(slots[2])
+        self.arena.counts[slots[3]] = 10
+
+        self.assertIsNone(self.arena.allocate(60))
+
+        moves = self.arena.compact()
+
+        self.assertEqual(moves, [(25, 0, 25), (75, 25, 10)])
+        self.assertEqual(self.arena.free_ranges, [(35, 65)])
+        self.assertIsNotNone(self.arena.allocate(60))
+
+    def test_ranges(self):
+
+        first = self.arena.allocate(10)
+        second = self.arena.allocate(20)
+        self.arena.allocate(30)
+
+        self.arena.visible[[first, second]] = True
+        self.arena.free(first)
+
+        firsts, counts = self.arena.ranges()
+
+        self.assertEqual(list(firsts), [10])
+        self.assertEqual(list(counts), [20])
+
+    def test_compactable_space(self):
+
+        slot = self.arena.allocate(100)
+        self.assertEqual(self.arena.compactable_space, 0)
+
+        # shrunk range is reclaimed by compaction
+        self.arena.counts[slot] = 60
+        self.assertEqual(self.arena.free_space, 0)
+        self.assertEqual(self.arena.compactable_space, 40)
+
+        self.assertFalse(self.arena.empty)
+        self.arena.free(slot)
+        self.assertTrue(self.arena.empty)
+
+    def test_full_arena(self):
+
+        self.arena.allocate(100)
+        self.assertIsNone(self.arena.allocate(1))
+
+        # empty mesh gets a slot without space
+        slot = self.arena.allocate(0)
+        self.assertIsNotNone(slot)
+        self.assertEqual(self.arena.sizes[slot], 0)
+        self.assertEqual(self.arena.free_ranges, [])
+        self.assertEqual(self.arena.compact(), [(0, 0, 100)])
+
+        self.arena.free(slot)
+        self.assertEqual(self.arena.free_ranges, [])
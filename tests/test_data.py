@@ -5,8 +5,12 @@ from __future__ import print_function
 
 import unittest
 import math
+import time
+
+import numpy
 
 import data
+import functions
 
 
 class TestPoint(unittest.TestCase):
@@ -45,3 +49,448 @@ class TestPoint(unittest.TestCase):
         p2 = data.Point(10, 0, -10)
         result = p1.chunk_distance(p2)
         self.assertAlmostEqual(result, math.sqrt(pow(20, 2) + pow(-20, 2)))
+
+
+class TestChunk(unittest.TestCase):
+
+    def setUp(self):
+
+        self.chunk = data.NormalChunk(data.Point(8, 0, 16))
+
+    def test_blocks(self):
+
+        blocks = self.chunk.blocks
+        self.assertEqual(blocks.shape, (8, 128, 8))
+        self.assertEqual(blocks.dtype, data.BLOCK_DTYPE)
+        self.assertTrue((blocks[:, 50:, :] == data.AIR).all())
+
+    def test_collision(self):
+
+        blocks = numpy.zeros((8, 128, 8), dtype=data.BLOCK_DTYPE)
+        blocks[1, 2, 3] = data.SOLID
+        chunk = data.NormalChunk(data.Point(8, 0, 16), blocks=blocks)
+
+        self.assertTrue(chunk.collision(data.Point(9.2, 2.3, 18.9)))
+        self.assertFalse(chunk.collision(data.Point(9.2, 3.3, 18.9)))
+
+        info = chunk.block_collision(data.Point(9.2, 2.3, 18.9))
+        self.assertEqual(info.position, (1, 2, 3))
+        self.assertEqual(info.chunk_id, chunk.chunk_id)
+        self.assertIsNone(chunk.block_collision(data.Point(8, 2, 19)))
+
+    def test_collision_reference(self):
+
+        def reference(chunk, point):
+
+            position = chunk.position
+            for x in range(int(point.x - 2 - position.x),
+                           int(point.x + 2 - position.x)):
+                for y in range(int(point.y - 2 - position.y),
+                               int(point.y + 2 - position.y)):
+                    for z in range(int(point.z - 2 - position.z),
+                                   int(point.z + 2 - position.z)):
+
+                        if (0 <= x < chunk.size and 0 <= y < chunk.height
+                                and 0 <= z < chunk.size
+                                and abs(x + position.x - point.x) < 0.5
+                                and abs(y + position.y - point.y) < 0.5
+                                and abs(z + position.z - point.z) < 0.5
+                                and chunk.blocks[x, y, z] != data.AIR):
+
+                            return (x, y, z)
+
+            return None
+
+        random_state = numpy.random.RandomState(7)
+        points = random_state.uniform(5, 19, (3000, 3))
+        points[:, 1] = random_state.uniform(-2, 60, 3000)
+        # points on block faces and chunk borders
+        points[:1000] = numpy.round(points[:1000] * 2) / 2
+
+        for x_pos, y_pos, z_pos in points:
+
+            point = data.Point(x_pos, y_pos, z_pos)
+            expected = reference(self.chunk, point)
+            info = self.chunk.block_collision(point)
+
+            self.assertEqual(self.chunk.collision(point), expected is not None)
+            if expected is None:
+
+                self.assertIsNone(info)
+
+            else:
+
+                self.assertEqual(info.position, expected)
+
+
+class TestChunkCache(unittest.TestCase):
+
+    def test_eviction(self):
+
+        cache = data.ChunkCache(2)
+
+        self.assertEqual(cache.add((0, 0), "a"), [])
+        self.assertEqual(cache.add((8, 0), "b"), [])
+        self.assertEqual(cache.add((0, 0), "a"), [])
+        self.assertEqual(cache.add((16, 0), "c"), [((8, 0), "b")])
+
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.pop((0, 0)), "a")
+        self.assertIsNone(cache.pop((0, 0)))
+        self.assertNotIn((0, 0), cache)
+
+
+class PoolStub(object):
+    """Pool running tasks at once, results wait for sending."""
+
+    def __init__(self):
+
+        self.tasks = []
+        self.results = {}
+
+    def apply_async(self, func, args, callback):
+
+        self.tasks.append(args[1])
+        self.results[args[1]] = func(*args)
+
+    def close(self):
+
+        pass
+
+    def join(self):
+
+        pass
+
+
+class TestChunkCreator(unittest.TestCase):
+
+    def setUp(self):
+
+        self.chunks = {}
+        self.creator = data.ChunkCreator(self.chunks, workers=1)
+        self.creator.wait_for_procs()
+        self.creator.pool = PoolStub()
+
+    def tearDown(self):
+
+        self.creator.wait_for_procs()
+
+    def finish(self, position):
+
+        self.creator.chunk_done(self.creator.pool.results.pop(position))
+
+    def test_priority(self):
+
+        for x_pos in (0, 8, 16, 24, 32):
+
+            self.creator.create(data.NormalChunk, (x_pos, 0))
+
+        self.creator.create(data.NormalChunk, (8, 0))
+        self.assertEqual(len(self.creator.pending_tasks), 5)
+
+        # the centre moves to the end of the row
+        self.creator.set_centre(data.Point(36, 0, 4), 30)
+        self.creator.dispatch_tasks()
+
+        self.assertEqual(self.creator.pool.tasks, [(32, 0), (24, 0)])
+        self.assertTrue(self.creator.task_exists((8, 0)))
+        self.assertFalse(self.creator.task_exists((0, 0)))
+
+        # finished task frees place for another one
+        self.finish((32, 0))
+        self.creator.build_ready_chunks()
+        self.creator.dispatch_tasks()
+
+        self.assertIn((32, 0), self.chunks)
+        self.assertEqual(self.creator.pool.tasks[-1], (16, 0))
+
+        # stale task is dropped before sending
+        self.creator.set_centre(data.Point(100, 0, 4), 200)
+        self.chunks[(8, 0)] = None
+        self.finish((24, 0))
+        self.creator.build_ready_chunks()
+        self.creator.dispatch_tasks()
+
+        self.assertEqual(len(self.creator.pool.tasks), 3)
+        self.assertFalse(self.creator.task_exists((8, 0)))
+
+    def test_view_priority(self):
+
+        world = data.BlockWorld(data.NormalChunk, 0, 0)
+        world.chunk_creator.wait_for_procs()
+        world.chunk_creator.pool = PoolStub()
+
+        point = data.Point(4, 0, 4)
+        world.generate_chunks(point, 40, (1, 0))
+
+        # the heap agrees with the view-biased order
+        expected = [
+            tuple(position)
+            for position in world.find_necessary_chunks(point, 40, (1, 0))
+        ]
+        self.assertEqual(
+            world.chunk_creator.pool.tasks,
+            expected[:world.chunk_creator.max_active_tasks])
+
+        world.chunk_creator.wait_for_procs()
+
+    def test_build_budget(self):
+
+        for x_pos in (0, 8):
+
+            self.creator.create(data.NormalChunk, (x_pos, 0))
+
+        self.creator.dispatch_tasks()
+        self.finish((0, 0))
+        self.finish((8, 0))
+
+        # at least one chunk is built after the deadline
+        self.creator.build_ready_chunks(time.time() - 1)
+        self.assertEqual(list(self.chunks), [(0, 0)])
+
+        self.creator.build_ready_chunks()
+        self.assertEqual(len(self.chunks), 2)
+        self.assertEqual(self.creator.prepared_chunks, {})
+
+    def test_failed_task(self):
+
+        self.creator.generator = "unknown"
+        self.creator.create(data.NormalChunk, (0, 0))
+        self.creator.dispatch_tasks()
+
+        # the error is returned, the worker doesn't raise
+        self.finish((0, 0))
+        self.creator.update()
+
+        self.assertFalse(self.creator.task_exists((0, 0)))
+        self.assertEqual(len(self.creator.slabs.free_slabs), 2)
+        self.assertEqual(self.chunks, {})
+
+        # the chunk is not created again before the delay
+        self.creator.generator = "flat"
+        self.creator.create(data.NormalChunk, (0, 0))
+        self.assertFalse(self.creator.task_exists((0, 0)))
+
+        self.creator.failed_positions[(0, 0)] = time.time() - 1
+        self.creator.create(data.NormalChunk, (0, 0))
+        self.creator.dispatch_tasks()
+        self.finish((0, 0))
+        self.creator.update()
+
+        self.assertIn((0, 0), self.chunks)
+
+    def test_shared_blocks(self):
+
+        creator = data.ChunkCreator(self.chunks, workers=1, seed=3)
+        creator.wait_for_procs()
+        creator.pool = PoolStub()
+
+        for x_pos in (0, 8, 16):
+
+            creator.create(data.NormalChunk, (x_pos, 0))
+
+        creator.dispatch_tasks()
+        # all slabs are used
+        self.assertEqual(creator.pool.tasks, [(0, 0), (8, 0)])
+
+        creator.chunk_done(creator.pool.results.pop((0, 0)))
+        creator.build_ready_chunks()
+        creator.dispatch_tasks()
+        creator.chunk_done(creator.pool.results.pop((16, 0)))
+        creator.build_ready_chunks()
+
+        # reused slab has no blocks of the previous chunk
+        for position in ((0, 0), (16, 0)):
+
+            expected = functions.generate_chunk(
+                data.NormalChunk.size, data.NormalChunk.height,
+                seed=3, position=position)
+            numpy.testing.assert_array_equal(
+                self.chunks[position].blocks, expected)
+
+        creator.wait_for_procs()
+
+
+class TestBlockWorld(unittest.TestCase):
+
+    def setUp(self):
+
+        self.world = data.BlockWorld(data.NormalChunk, 32, 32, seed=1)
+
+    def tearDown(self):
+
+        self.world.chunk_creator.wait_for_procs()
+
+    def test_unload_chunks(self):
+
+        point = data.Point(4, 0, 4)
+        chunk = self.world.chunks[(24, 24)]
+
+        unloaded = self.world.unload_chunks(point, 20)
+
+        self.assertIn(chunk, unloaded)
+        self.assertNotIn((24, 24), self.world.chunks)
+        self.assertIn((0, 0), self.world.chunks)
+        self.assertEqual(
+            len(self.world.chunks) + len(unloaded), 16)
+
+        self.world.generate_chunk((24, 24))
+        self.assertIs(self.world.chunks[(24, 24)], chunk)
+
+    def test_neighbour_blocks(self):
+
+        neighbours = self.world.neighbour_blocks((0, 8))
+
+        self.assertIs(neighbours[(1, 0)], self.world.chunks[(8, 8)].blocks)
+        self.assertIs(neighbours[(0, -1)], self.world.chunks[(0, 0)].blocks)
+        self.assertIsNone(neighbours[(-1, 0)])
+
+    def test_chunk_key(self):
+
+        self.assertEqual(self.world.chunk_key(0, 0), (0, 0))
+        self.assertEqual(self.world.chunk_key(-0.5, 7.4), (0, 0))
+        self.assertEqual(self.world.chunk_key(-0.6, 7.5), (-8, 8))
+        self.assertEqual(self.world.chunk_key(17, -9), (16, -16))
+        self.assertEqual(self.world.in_chunk(data.Point(9, 0, 30)), (8, 24))
+        self.assertIsNone(self.world.in_chunk(data.Point(40, 0, 0)))
+
+    def test_collision(self):
+
+        random_state = numpy.random.RandomState(5)
+        points = random_state.uniform(-2, 34, (2000, 3))
+        points[:, 1] = random_state.uniform(0, 60, 2000)
+
+        for x_pos, y_pos, z_pos in points:
+
+            expected = any(
+                chunk.collision(data.Point(x_pos, y_pos, z_pos))
+                for chunk in self.world.chunks.values())
+
+            self.assertEqual(
+                self.world.collision(data.Point(x_pos, y_pos, -z_pos)),
+                expected)
+
+    def test_collide_many(self):
+
+        random_state = numpy.random.RandomState(6)
+        points = random_state.uniform(-34, 2, (3000, 3))
+        points[:, 1] = random_state.uniform(-2, 130, 3000)
+        points[:1000] = numpy.round(points[:1000] * 2) / 2
+
+        collisions = self.world.collide_many(points)
+
+        self.assertEqual(collisions.shape, (3000,))
+        for point, collision in zip(points, collisions):
+
+            self.assertEqual(
+                self.world.collision(data.Point(*point)), collision)
+
+        self.assertEqual(self.world.collide_many([]).shape, (0,))
+
+    def test_find_necessary_chunks(self):
+
+        for x_pos, z_pos, distance in ((4, 4, 22), (-13.7, 100.2, 30),
+                                       (0, -0.5, 8), (3, 3, 2)):
+
+            point = data.Point(x_pos, 0, z_pos)
+            positions = self.world.find_necessary_chunks(point, distance)
+
+            expected = set()
+            for chunk_x in range(-20, 20):
+                for chunk_z in range(-20, 30):
+
+                    centre = data.Point(chunk_x * 8 + 4, 0, chunk_z * 8 + 4)
+                    if point.chunk_distance(centre) <= distance:
+
+                        expected.add((chunk_x * 8, chunk_z * 8))
+
+            self.assertEqual(set(positions), expected)
+            self.assertEqual(len(positions), len(expected))
+
+            distances = [
+                point.chunk_distance(data.Point(x + 4, 0, z + 4))
+                for x, z in positions]
+            self.assertEqual(distances, sorted(distances))
+
+        point = data.Point(4, 0, 4)
+        positions = self.world.find_necessary_chunks(point, 30, (1, 0))
+        self.assertEqual(positions[0], (0, 0))
+        self.assertEqual(positions[1], (8, 0))
+        self.assertEqual(
+            set(positions), set(self.world.find_necessary_chunks(point, 30)))
+
+
+class TestRaycast(unittest.TestCase):
+
+    def setUp(self):
+
+        self.world = data.BlockWorld(
+            data.NormalChunk, 16, 16, seed=2, generator="flat")
+
+    def tearDown(self):
+
+        self.world.chunk_creator.wait_for_procs()
+
+    def test_raycast(self):
+
+        info, normal = self.world.raycast((4, 60, 4), (0, -1, 0), 20)
+        self.assertEqual(info.position, (4, 49, 4))
+        self.assertEqual(normal, (0, 1, 0))
+
+        # ray from missing chunk over chunk border
+        info, normal = self.world.raycast((12, 49, -5), (0, 0, 1), 20)
+        self.assertEqual(info.position, (4, 49, 0))
+        self.assertEqual(info.chunk_position, data.Point(8, 0, 0))
+        self.assertEqual(normal, (0, 0, -1))
+
+        info, normal = self.world.raycast((3.2, 40.3, 3), (1, 1, 0), 20)
+        self.assertEqual(info.position, (3, 40, 3))
+        self.assertEqual(normal, (0, 0, 0))
+
+        self.assertIsNone(self.world.raycast((4, 60, 4), (0, -1, 0), 5))
+        self.assertIsNone(self.world.raycast((4, 60, 4), (1, 0.2, 0), 50))
+
+    def test_raycast_many(self):
+
+        random_state = numpy.random.RandomState(3)
+        origins = random_state.uniform(0, 16, (200, 3))
+        origins[:, 1] += 50
+        directions = random_state.uniform(-1, 1, (200, 3))
+
+        results = self.world.raycast_many(origins, directions, 30)
+
+        for origin, direction, result in zip(origins, directions, results):
+
+            # reference by sampling points on the ray
+            direction = direction / numpy.sqrt((direction ** 2).sum())
+            distances = numpy.arange(0, 30, 0.002)[:, numpy.newaxis]
+            cells = numpy.floor(origin + distances * direction + 0.5)
+            cells = cells.astype(int)
+            solid = numpy.flatnonzero(self.world.blocks_at(
+                cells[:, 0], cells[:, 1], cells[:, 2]))
+
+            if result is None:
+
+                self.assertEqual(len(solid), 0)
+                continue
+
+            info, normal = result
+            key = self.world.chunk_key(*cells[solid[0]][[0, 2]])
+            self.assertEqual(
+                (info.position[0] + key.x,
+                 info.position[1],
+                 info.position[2] + key.z),
+                tuple(cells[solid[0]]))
+            self.assertEqual(
+                tuple(cells[solid[0]] - cells[solid[0] - 1]),
+                tuple(-numpy.array(normal)))
+
+    def test_raycast_zero_direction(self):
+
+        # zero direction hits nothing, even inside a solid block
+        results = self.world.raycast_many(
+            [(4, 10, 4), (4, 60, 4)], [(0, 0, 0), (0, -1, 0)], 20)
+
+        self.assertIsNone(results[0])
+        self.assertIsNotNone(results[1])
+        self.assertIsNone(self.world.raycast((4, 60, 4), (0, 0, 0), 20))
@@ -0,0 +1,62 @@
+# -*- encoding: utf-8 -*-
+
+from __future__ import unicode_literals
+from __future__ import print_function
+
+import unittest
+
+import data
+import functions
+
+
+class TestGenerateChunk(unittest.TestCase):
+
+    def test_random(self):
+
+        blocks = functions.generate_chunk(8, 128)
+
+        self.assertEqual(blocks.shape, (8, 128, 8))
+        self.assertEqual(blocks.dtype, data.BLOCK_DTYPE)
+        self.assertTrue((blocks[:, functions.GROUND_LEVEL:, :] == 0).all())
+        self.assertTrue(blocks.any())
+
+    def test_flat(self):
+
+        blocks = functions.generate_chunk(2, 128, mode="flat")
+
+        self.assertTrue(
+            (blocks[:, :functions.GROUND_LEVEL, :] == data.SOLID).all())
+        self.assertTrue(
+            (blocks[:, functions.GROUND_LEVEL:, :] == data.AIR).all())
+
+    def test_chunks(self):
+
+        positions = [(0, 0), (8, 0), (0, -8)]
+        blocks = functions.generate_chunks(positions, 8, 128, seed=1)
+        same_blocks = functions.generate_chunks(positions, 8, 128, seed=1)
+
+        self.assertEqual(blocks.shape, (3, 8, 128, 8))
+        self.assertTrue((blocks == same_blocks).all())
+        self.assertFalse((blocks[0] == blocks[1]).all())
+
+        blocks = functions.generate_chunk(8, 128, seed=1, position=(8, 0))
+        self.assertTrue((blocks == same_blocks[1]).all())
+
+    def test_noise(self):
+
+        positions = [(0, 0), (8, 0), (0, 8)]
+        blocks = functions.generate_chunks(positions, 8, 128, "noise", 7)
+        same_blocks = functions.generate_chunks(
+            positions[::-1], 8, 128, "noise", 7)
+        other_blocks = functions.generate_chunks(positions, 8, 128, "noise", 8)
+
+        self.assertTrue((blocks == same_blocks[::-1]).all())
+        self.assertFalse((blocks == other_blocks).all())
+        self.assertTrue((blocks[:, :, 0, :] == data.SOLID).all())
+
+        # terrain continues over chunk borders
+        heights = blocks.sum(axis=2)
+        self.assertTrue(
+            (abs(heights[0, -1, :] - heights[1, 0, :]) <= 2).all())
+        self.assertTrue(
+            (abs(heights[0, :, -1] - heights[2, :, 0]) <= 2).all())
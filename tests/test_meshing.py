@@ -0,0 +1,238 @@
+# -*- encoding: utf-8 -*-
+
+from __future__ import unicode_literals
+from __future__ import print_function
+
+import unittest
+
+import numpy
+
+import data
+import functions
+import meshing
+
+
+class TestCubeMesh(unittest.TestCase):
+
+    def test_cubes(self):
+
+        blocks = functions.generate_chunk(8, 16, seed=5)
+
+        vertexes = meshing.cube_mesh(blocks, (8, 0))
+
+        self.assertEqual(vertexes.shape, (blocks.sum() * 36, 3))
+        self.assertEqual(vertexes.dtype, numpy.float32)
+
+        # cubes and their faces next to air have the same vertexes
+        faces = meshing.face_mesh(blocks, (8, 0))
+        cube_set = set(map(tuple, vertexes.tolist()))
+        self.assertTrue(set(map(tuple, faces.tolist())) <= cube_set)
+
+
+class TestFaceMesh(unittest.TestCase):
+
+    def test_single_block(self):
+
+        blocks = numpy.zeros((2, 2, 2), dtype=data.BLOCK_DTYPE)
+        blocks[1, 0, 1] = data.SOLID
+
+        vertexes = meshing.face_mesh(blocks, (8, 16))
+
+        self.assertEqual(vertexes.shape, (36, 3))
+        self.assertEqual(vertexes.dtype, numpy.float32)
+        numpy.testing.assert_array_equal(
+            vertexes.min(axis=0), (8.5, -0.5, 16.5))
+        numpy.testing.assert_array_equal(
+            vertexes.max(axis=0), (9.5, 0.5, 17.5))
+
+        # front face as in GraphicBlock
+        numpy.testing.assert_array_equal(vertexes[:6], [
+            (8.5, -0.5, 17.5),
+            (9.5, -0.5, 17.5),
+            (9.5, 0.5, 17.5),
+            (8.5, -0.5, 17.5),
+            (9.5, 0.5, 17.5),
+            (8.5, 0.5, 17.5),
+        ])
+
+    def test_exposed_faces(self):
+
+        blocks = functions.generate_chunk(8, 16, seed=5)
+
+        indexes, faces = meshing.exposed_faces(blocks)
+
+        # reference count of faces next to air or chunk border
+        expected = 0
+        for x_pos, y_pos, z_pos in zip(*numpy.nonzero(blocks)):
+            for x_dir, y_dir, z_dir in meshing.NORMALS:
+
+                neighbour = (x_pos + x_dir, y_pos + y_dir, z_pos + z_dir)
+                inside = all(
+                    0 <= value < size
+                    for value, size in zip(neighbour, blocks.shape))
+
+                if not inside or blocks[neighbour] == data.AIR:
+
+                    expected += 1
+
+        self.assertEqual(len(faces), expected)
+        self.assertTrue(blocks[tuple(indexes.T)].all())
+
+    def test_empty_chunk(self):
+
+        blocks = numpy.zeros((8, 16, 8), dtype=data.BLOCK_DTYPE)
+
+        self.assertEqual(meshing.face_mesh(blocks, (0, 0)).shape, (0, 3))
+
+
+class TestGreedyMesh(unittest.TestCase):
+
+    def test_flat_chunk(self):
+
+        blocks = functions.generate_chunk(8, 64, "flat")
+
+        vertexes = meshing.greedy_mesh(blocks, (0, 0))
+
+        # one rectangle for every side
+        self.assertEqual(vertexes.shape, (36, 3))
+        numpy.testing.assert_array_equal(vertexes.min(axis=0), (-0.5,) * 3)
+        numpy.testing.assert_array_equal(
+            vertexes.max(axis=0), (7.5, functions.GROUND_LEVEL - 0.5, 7.5))
+
+    def test_covered_area(self):
+
+        blocks = functions.generate_chunk(8, 16, seed=7)
+
+        vertexes = meshing.greedy_mesh(blocks, (0, 0)).reshape(-1, 6, 3)
+
+        # sum of rectangle areas is the number of exposed faces
+        sides = vertexes[:, 2] - vertexes[:, 0]
+        areas = numpy.prod(numpy.where(sides == 0, 1, abs(sides)), axis=1)
+
+        self.assertEqual(areas.sum(), len(meshing.exposed_faces(blocks)[1]))
+        self.assertLess(len(vertexes), len(meshing.exposed_faces(blocks)[1]))
+
+    def test_rectangles(self):
+
+        layer = numpy.array([
+            [1, 1, 0],
+            [1, 1, 2],
+            [0, 2, 2],
+        ])
+
+        self.assertEqual(
+            meshing.greedy_rectangles(layer),
+            [(0, 0, 1, 1), (1, 2, 2, 2), (2, 1, 2, 1)])
+
+
+class TestChunkMesh(unittest.TestCase):
+
+    def setUp(self):
+
+        self.blocks = functions.generate_chunk(8, 64, "noise", 1, (0, 0))
+
+        neighbours = {}
+        for direction in meshing.BORDER_FACES.values():
+
+            neighbours[direction] = functions.generate_chunk(
+                8, 64, "noise", 1, (direction[0] * 8, direction[1] * 8))
+
+        self.borders = meshing.border_layers(neighbours)
+
+    def test_missing_neighbours(self):
+
+        for mode in ("faces", "greedy"):
+
+            vertexes, border_start = meshing.chunk_mesh(
+                self.blocks, (0, 0), mode)
+
+            self.assertEqual(len(vertexes), len(
+                meshing.chunk_mesh(self.blocks, (0, 0), mode, {})[0]))
+            self.assertLess(border_start, len(vertexes))
+
+        vertexes, border_start = meshing.chunk_mesh(
+            self.blocks, (0, 0), "faces")
+        self.assertEqual(len(vertexes), len(
+            meshing.face_mesh(self.blocks, (0, 0))))
+
+    def test_neighbours(self):
+
+        for mode in ("faces", "greedy"):
+
+            provisional, _ = meshing.chunk_mesh(self.blocks, (0, 0), mode)
+            vertexes, border_start = meshing.chunk_mesh(
+                self.blocks, (0, 0), mode, self.borders)
+
+            self.assertLess(len(vertexes), len(provisional))
+            numpy.testing.assert_array_equal(
+                vertexes[:border_start], provisional[:border_start])
+
+            # border faces can be rebuilt alone
+            numpy.testing.assert_array_equal(
+                vertexes[border_start:],
+                meshing.border_mesh(
+                    self.blocks, (0, 0), mode, self.borders))
+
+    def test_border_layers(self):
+
+        neighbour = numpy.zeros((8, 64, 8), dtype=data.BLOCK_DTYPE)
+        neighbour[0, 10, 3] = data.SOLID
+
+        borders = meshing.border_layers({(1, 0): neighbour})
+
+        self.assertIsNone(borders[0])
+        self.assertTrue(borders[2][10, 3])
+        self.assertEqual(borders[2].sum(), 1)
+
+
+class TestPackedVertexes(unittest.TestCase):
+
+    def test_pack(self):
+
+        blocks = functions.generate_chunk(8, 64, "noise", 1, (16, -8))
+        vertexes = meshing.greedy_mesh(blocks, (16, -8))
+
+        packed = meshing.pack_vertexes(vertexes, (16, -8))
+
+        self.assertEqual(packed.dtype, numpy.uint8)
+        self.assertEqual(packed.shape, (len(vertexes), 4))
+
+        # shader position is chunk origin + corner - 0.5
+        numpy.testing.assert_array_equal(
+            packed[:, :3] + numpy.array([16, 0, -8]) - 0.5, vertexes)
+
+        # face numbers from the block faces
+        faces = meshing.pack_vertexes(
+            meshing.cube_mesh(blocks[:1, :1, :1], (0, 0)), (0, 0))[:, 3]
+        numpy.testing.assert_array_equal(
+            faces, numpy.repeat(numpy.arange(6), 6))
+
+    def test_too_big(self):
+
+        vertexes = numpy.array([[0.5, 300.5, 0.5]] * 6)
+
+        self.assertRaises(
+            ValueError, meshing.pack_vertexes, vertexes, (0, 0))
+
+
+class TestQuadVertexes(unittest.TestCase):
+
+    def test_quads(self):
+
+        blocks = functions.generate_chunk(8, 64, "noise", 1, (0, 0))
+        vertexes = meshing.face_mesh(blocks, (0, 0))
+
+        quads = meshing.quad_vertexes(vertexes)
+        self.assertEqual(len(quads), len(vertexes) // 6 * 4)
+
+        # indexed quads give the same triangles
+        indexes = meshing.quad_indexes(len(quads) // 4)
+        numpy.testing.assert_array_equal(quads[indexes], vertexes)
+
+    def test_indexes(self):
+
+        indexes = meshing.quad_indexes(2)
+
+        self.assertEqual(indexes.dtype, numpy.uint32)
+        self.assertEqual(
+            list(indexes), [0, 1, 2, 0, 2, 3, 4, 5, 6, 4, 6, 7])
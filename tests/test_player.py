@@ -0,0 +1,61 @@
+# -*- encoding: utf-8 -*-
+
+from __future__ import unicode_literals
+from __future__ import print_function
+
+import unittest
+
+import numpy
+
+import camera
+import data
+import player
+
+
+class WallRenderer(object):
+    """Renderer stub with a wall of blocks in front of the camera."""
+
+    def __init__(self, wall_z):
+
+        self.wall_z = wall_z
+
+    def blocks_at(self, x_indexes, y_indexes, z_indexes):
+
+        return numpy.where(
+            z_indexes == self.wall_z, data.SOLID, data.AIR).astype(
+                data.BLOCK_DTYPE)
+
+
+class TestBody(unittest.TestCase):
+
+    def setUp(self):
+
+        # camera looks to negative world z
+        self.camera = camera.FPSCamera(x_pos=0.3, y_pos=10, z_pos=0.0)
+        self.body = player.Body(self.camera, WallRenderer(-5), 0.1, 1.9)
+
+    def test_sweep_stops_before_block(self):
+
+        x_step, y_step, z_step = self.body.sweep(0.0, 0.0, 100.0)
+
+        self.assertEqual((x_step, y_step), (0.0, 0.0))
+        # block -5 starts at world z -4.5
+        self.assertAlmostEqual(z_step, 4.5 - 0.1 - self.body.skin)
+
+    def test_sweep_free(self):
+
+        self.assertEqual(self.body.sweep(0.0, 0.0, 3.0), (0.0, 0.0, 3.0))
+        self.assertEqual(self.body.sweep(5.0, -2.0, -9.0), (5.0, -2.0, -9.0))
+
+    def test_forward(self):
+
+        self.camera.step = 50.0
+
+        self.body.forward()
+        self.assertAlmostEqual(self.camera.z_pos, 4.4 - self.body.skin)
+
+        self.body.forward()
+        self.assertAlmostEqual(self.camera.z_pos, 4.4 - self.body.skin)
+
+        self.body.backward()
+        self.assertAlmostEqual(self.camera.z_pos, 4.4 - 50.0 - self.body.skin)
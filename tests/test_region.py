@@ -0,0 +1,88 @@
+# -*- encoding: utf-8 -*-
+
+from __future__ import unicode_literals
+from __future__ import print_function
+
+import unittest
+import tempfile
+import shutil
+import os
+
+import data
+import functions
+import region
+
+
+class TestRegionStore(unittest.TestCase):
+
+    def setUp(self):
+
+        self.directory = tempfile.mkdtemp()
+        self.store = region.RegionStore(self.directory, data.NormalChunk)
+
+    def tearDown(self):
+
+        self.store.close()
+        shutil.rmtree(self.directory)
+
+    def test_round_trip(self):
+
+        positions = [(0, 0), (8, 0), (-8, 24), (256, -512)]
+        chunks = functions.generate_chunks(positions, 8, 128, seed=3)
+
+        for position, blocks in zip(positions, chunks):
+
+            self.store.save(position, blocks)
+
+        self.store.close()
+
+        store = region.RegionStore(self.directory, data.NormalChunk)
+        for position, blocks in zip(positions, chunks):
+
+            self.assertTrue(store.contains(position))
+            self.assertTrue((store.load(position) == blocks).all())
+
+        self.assertFalse(store.contains((16, 0)))
+        self.assertIsNone(store.load((16, 0)))
+        self.assertIsNone(store.load((1024, 1024)))
+
+        store.close()
+
+    def test_overwrite(self):
+
+        blocks = functions.generate_chunk(8, 128, "flat")
+        self.store.save((0, 0), blocks)
+        self.assertTrue((self.store.load((0, 0)) == blocks).all())
+
+        blocks[:] = data.AIR
+        self.store.save((0, 0), blocks)
+        self.assertTrue((self.store.load((0, 0)) == data.AIR).all())
+
+        filename = self.store.region_filename((0, 0))
+        region_file = self.store.get_region((0, 0))
+        self.assertEqual(
+            os.path.getsize(filename),
+            region_file.data_offset + region_file.chunk_bytes)
+
+    def test_incompatible(self):
+
+        self.store.save((0, 0), functions.generate_chunk(8, 128))
+        self.store.close()
+
+        store = region.RegionStore(self.directory, data.SmallChunk)
+        self.assertRaises(region.RegionError, store.load, (0, 0))
+
+    def test_world_seed(self):
+
+        # new world gets a random seed
+        seed = self.store.world_seed(None, "noise")
+        self.assertIsNotNone(seed)
+
+        store = region.RegionStore(self.directory, data.NormalChunk)
+        self.assertEqual(store.world_seed(None, "noise"), seed)
+        self.assertEqual(store.world_seed(seed, "noise"), seed)
+
+        self.assertRaises(
+            region.RegionError, store.world_seed, seed + 1, "noise")
+        self.assertRaises(
+            region.RegionError, store.world_seed, seed, "flat")
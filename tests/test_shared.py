@@ -0,0 +1,90 @@
+# -*- encoding: utf-8 -*-
+
+from __future__ import unicode_literals
+from __future__ import print_function
+
+import unittest
+import os
+
+import numpy
+
+import shared
+
+
+class TestSlabPool(unittest.TestCase):
+
+    def setUp(self):
+
+        self.slabs = shared.SlabPool(2, 64)
+
+    def tearDown(self):
+
+        self.slabs.close()
+
+    def test_checkout(self):
+
+        first = self.slabs.checkout()
+        second = self.slabs.checkout()
+
+        self.assertEqual(set([first, second]), set([0, 1]))
+        self.assertIsNone(self.slabs.checkout())
+
+        self.slabs.release(first)
+        self.assertEqual(self.slabs.checkout(), first)
+
+    def test_attached_slab(self):
+
+        slab = self.slabs.checkout()
+        blocks = numpy.arange(64, dtype=numpy.uint8).reshape(4, 4, 4)
+        self.slabs.slab(slab, numpy.uint8, (4, 4, 4))[...] = blocks
+
+        # worker side uses only the handle
+        attached = shared.slab_array(
+            self.slabs.handle, slab, numpy.uint8, (4, 4, 4))
+        numpy.testing.assert_array_equal(attached, blocks)
+
+        attached[0, 0, 0] = 200
+        self.assertEqual(
+            self.slabs.slab(slab, numpy.uint8, (4, 4, 4))[0, 0, 0], 200)
+
+        shared.attached_buffers.pop(self.slabs.buffer.filename).close()
+
+    def test_close(self):
+
+        filename = self.slabs.buffer.filename
+        self.slabs.close()
+
+        self.assertFalse(os.path.exists(filename))
+
+        self.slabs = shared.SlabPool(1, 1)
+
+
+class TestBufferPool(unittest.TestCase):
+
+    def setUp(self):
+
+        self.buffers = shared.BufferPool(buffer_size=16)
+
+    def tearDown(self):
+
+        self.buffers.close()
+
+    def test_write(self):
+
+        first = self.buffers.checkout()
+        second = self.buffers.checkout()
+        self.assertNotEqual(first, second)
+
+        # worker grows the small buffer
+        values = numpy.arange(100, dtype=numpy.float32)
+        count = shared.write_array(
+            self.buffers.handle(first), values, numpy.float32)
+
+        self.assertEqual(count, 100)
+        numpy.testing.assert_array_equal(
+            self.buffers.array(first, numpy.float32, count), values)
+
+        self.buffers.release(first)
+        self.assertEqual(self.buffers.checkout(), first)
+
+        shared.attached_buffers.pop(self.buffers.handle(first)).close()